@@ -0,0 +1,173 @@
+"""async_db.py
+
+Runs the read side of a Database on an asyncio event loop, with SQLAlchemy's
+async engine and the asyncpg, aiomysql or aiosqlite drivers, so that catalog
+queries, pages of rows and monitor samples can be in flight at the same time
+on one thread instead of queueing on the synchronous engine.
+
+An AsyncDatabase wraps an ordinary Database, which it takes its credentials,
+reflected tables, statements and result cache from, so the two can be used
+side by side. Writes still go through the synchronous Database.
+
+The interface drives the event loop itself through a LoopPump, between
+keystrokes, so it can start queries and pick up their results without
+blocking and without threads.
+
+Needs Python 3 and SQLAlchemy 1.4 or later."""
+
+
+import asyncio
+
+import sqlalchemy
+
+import result_cache
+
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine
+except ImportError:
+    create_async_engine = None
+
+
+# Async drivers for each protocol
+ASYNC_DRIVERS = {'postgresql': 'asyncpg', 'mysql': 'aiomysql', 'sqlite': 'aiosqlite'}
+
+
+def available(database):
+    "Whether database can be used through an AsyncDatabase"
+    if create_async_engine is None or database._protocol not in ASYNC_DRIVERS:
+        return False
+    try:
+        __import__(ASYNC_DRIVERS[database._protocol])
+    except ImportError:
+        return False
+    return True
+
+
+class AsyncDatabase:
+
+    def __init__(self, database, pool_size=5):
+        self.db = database
+        self.pool_size = pool_size
+        self._engine = None
+        self._url = None
+
+    def _db_string(self):
+        "Returns the url for the async driver, with the credentials escaped"
+        drivername = '{}+{}'.format(self.db._protocol, ASYNC_DRIVERS[self.db._protocol])
+        if self.db._protocol == 'sqlite':
+            # The file's url holds no credentials, and may be a read only URI
+            return sqlalchemy.engine.make_url(self.db._create_db_string()).set(drivername=drivername)
+        host, _, port = self.db._hostname.partition(':')
+        return sqlalchemy.engine.URL.create(drivername, username=self.db._username, \
+                password=self.db._password, host=host, port=int(port) if port else None, \
+                database=self.db._database)
+
+    async def engine(self):
+        "Returns the async engine, made again if the database has changed since"
+        url = self._db_string()
+        if self._engine is not None and url != self._url:
+            await self._engine.dispose()
+            self._engine = None
+        if self._engine is None:
+            # SQLite files get a new connection each time, so have no pool to size
+            options = {} if self.db._protocol == 'sqlite' else {'pool_size': self.pool_size}
+            self._engine = create_async_engine(url, **options)
+            self._url = url
+        return self._engine
+
+    async def _execute(self, stmt):
+        "Runs a statement, or SQL as written, returning its column names and rows"
+        engine = await self.engine()
+        async with engine.connect() as connection:
+            if isinstance(stmt, str):
+                result = await connection.exec_driver_sql(stmt)
+            else:
+                result = await connection.execute(stmt)
+            if not result.returns_rows:
+                await connection.commit()
+                return [], []
+            return list(result.keys()), result.fetchall()
+
+    async def query(self, query):
+        "Database.query, sharing its result cache"
+        cached = None
+        if self.db._result_cache is not None and result_cache.is_cacheable(query):
+            cached = self.db._result_cache.get(self.db._query_key(query))
+        if cached is not None:
+            return cached
+        columns, rows = await self._execute(query)
+        rows = [tuple(row) for row in rows]
+        self.db._remember_query(query, columns, rows)
+        return columns, rows
+
+    async def list_table_names(self):
+        engine = await self.engine()
+        async with engine.connect() as connection:
+            return await connection.run_sync( \
+                    lambda sync_connection: sqlalchemy.inspect(sync_connection).get_table_names())
+
+    async def count_rows(self, table_name):
+        columns, rows = await self._execute(self.db._count_select(table_name))
+        return rows[0][0]
+
+    async def list_rows_page(self, table_name, offset, limit):
+        "Database.list_rows_page, sharing its result cache"
+        key = self.db._page_key(table_name, offset, limit)
+        cached = self.db._cached(key)
+        if cached is not None:
+            return cached
+        stmt, convert = self.db._rows_page_select(table_name, offset, limit)
+        columns, rows = await self._execute(stmt)
+        rows = [convert(row._mapping) for row in rows]
+        self.db._cache_rows(key, table_name, rows)
+        return rows
+
+    async def table_stats(self):
+        if self.db._table_stats_sql is None:
+            # Nothing to ask the server for, as with SQLite
+            return self.db.table_stats()
+        columns, rows = await self._execute(self.db._table_stats_sql)
+        return self.db._table_stats_result(row._mapping for row in rows)
+
+    async def index_usage(self):
+        columns, rows = await self._execute(self.db._index_usage_sql)
+        return self.db._index_usage_result(row._mapping for row in rows)
+
+    async def index_report(self):
+        "Returns index_usage() and table_stats(), fetched at the same time"
+        return await asyncio.gather(self.index_usage(), self.table_stats())
+
+    async def close(self):
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+
+class LoopPump:
+    """An event loop run a step at a time from the interface's own loop.
+    submit() starts a coroutine and returns its future, pump() runs whatever
+    is ready, waiting briefly on a future if given, and run() waits for one coroutine, letting
+    everything else submitted make progress meanwhile."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+
+    def submit(self, coroutine):
+        return self.loop.create_task(coroutine)
+
+    def pump(self, future=None, budget=0.05):
+        """Runs whatever is ready. If future is given and isn't done, keeps
+        the loop going until it is or budget seconds have passed, so that the
+        round trips of a query don't each wait for the next call."""
+        if future is not None and not future.done():
+            self.loop.run_until_complete(asyncio.wait([future], timeout=budget))
+            return
+        # Stopping from the first callback makes run_forever go round once
+        self.loop.call_soon(self.loop.stop)
+        self.loop.run_forever()
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def close(self):
+        self.loop.close()
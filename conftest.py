@@ -0,0 +1,30 @@
+"""Fixtures shared by the tests. SQLite stands in for a database server, so
+the whole suite runs without one."""
+
+import sqlite3
+
+import pytest
+
+import db
+
+
+@pytest.fixture
+def make_sqlite(tmp_path):
+    """Returns a function creating a SQLite file from a script of SQL and
+    returning a connected db.SQLiteDatabase for it"""
+    databases = []
+
+    def make(script='', name='test.db', **options):
+        path = str(tmp_path / name)
+        connection = sqlite3.connect(path)
+        connection.executescript(script)
+        connection.close()
+        database = db.SQLiteDatabase(path, **options)
+        database.setup()
+        databases.append(database)
+        return database
+
+    yield make
+    for database in databases:
+        database._connection.close()
+        database._engine.dispose()
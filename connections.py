@@ -0,0 +1,100 @@
+"""connections.py
+
+Keeps connections to a whole inventory of database servers. Connections are
+only opened when a server is first used, and operations can be run against
+every server at once from a bounded pool of threads."""
+
+
+import json
+import threading
+from multiprocessing.pool import ThreadPool
+
+import db
+
+
+class ConnectionManager:
+
+    def __init__(self, servers, max_workers=8):
+        """servers is a list of dicts with the keys name, dbms, server,
+        username and password."""
+
+        self.servers = servers
+        self.max_workers = max_workers
+        self._databases = {}
+        self._locks = dict((spec['name'], threading.Lock()) for spec in servers)
+        self._pool = None
+
+    @classmethod
+    def from_inventory(cls, filename, defaults, max_workers=8):
+        """Reads a JSON inventory file holding a list of servers, e.g.
+
+            [{"name": "shard1", "server": "db1.example.com", "dbms": "mysql"},
+             {"server": "db2.example.com", "username": "admin", "password": "x"}]
+
+        Only server is required. Missing values are taken from defaults (the
+        command line arguments), and name defaults to the server's hostname."""
+
+        with open(filename, 'r') as f:
+            entries = json.load(f)
+
+        servers = []
+        for entry in entries:
+            spec = {'server': entry['server'],
+                    'name': entry.get('name', entry['server'])}
+            for key in ['dbms', 'username', 'password']:
+                spec[key] = entry.get(key, getattr(defaults, key))
+            servers.append(spec)
+        return cls(servers, max_workers)
+
+    def server_names(self):
+        return [spec['name'] for spec in self.servers]
+
+    def spec(self, name):
+        for spec in self.servers:
+            if spec['name'] == name:
+                return spec
+        raise KeyError(name)
+
+    def get(self, name):
+        """Returns the connected Database for a server, connecting to it the
+        first time it's asked for."""
+
+        with self._locks[name]:
+            if name not in self._databases:
+                spec = self.spec(name)
+                database = db.get_database(spec['dbms'], spec['username'],
+                                           spec['password'], spec['server'])
+                database.setup()
+                self._databases[name] = database
+            return self._databases[name]
+
+    def map(self, func, names=None):
+        """Calls func(database) for every server (or only those named) in
+        parallel, connecting where needed. Returns a dict of server name to a
+        (result, error) pair, one of which is None."""
+
+        if names is None:
+            names = self.server_names()
+        if self._pool is None:
+            self._pool = ThreadPool(self.max_workers)
+
+        def call(name):
+            try:
+                return name, (func(self.get(name)), None)
+            except Exception as e:
+                return name, (None, e)
+
+        return dict(self._pool.map(call, names))
+
+    def list_databases(self, names=None):
+        "Returns the databases on every server, keyed by server name"
+        return self.map(lambda database: database.list_databases(), names)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+        for database in self._databases.values():
+            database._engine.dispose()
+        self._databases = {}
@@ -0,0 +1,257 @@
+"""loader.py
+
+Loads a CSV or NDJSON file into an existing table. The file is read as a
+stream and written in batches, with COPY on Postgres and multi-row INSERTs
+on MySQL, so memory use doesn't grow with the file. Columns are matched to
+the table by the CSV header or each record's JSON keys. Rows the server
+refuses, and JSON records with keys the table has no column for, are
+written to a rejects file next to the input, in the same format plus an
+_error column, so they can be fixed and loaded again.
+
+Also applies a CSV of changes to existing rows in one set-based UPDATE."""
+
+
+import csv
+import json
+
+import sqlalchemy
+
+
+def counted_lines(f, tracker):
+    "Yields the lines of a file, reporting their size into tracker for progress through it"
+    for line in f:
+        if tracker is not None:
+            tracker.add(nbytes=len(line))
+        yield line
+
+
+def csv_value(column, value):
+    "CSV can't tell NULL from an empty string, so only text columns keep ''"
+    if value == '' and not isinstance(column.type, sqlalchemy.types.String):
+        return None
+    return value
+
+
+class TableLoader:
+
+    def __init__(self, database, table_name, filename, batch_rows=5000,
+                 rejects_filename=None):
+        self.db = database
+        self.table_name = table_name
+        self.filename = filename
+        self.batch_rows = batch_rows
+        self.ndjson = filename.lower().endswith(('.ndjson', '.jsonl', '.json'))
+        self.rejects_filename = rejects_filename or filename + '.rejects'
+
+        self.table = database.reflect_table(table_name)
+        self.columns = {}
+        for column in self.table.columns:
+            self.columns[column.name.lower()] = column
+
+        # Statistics about the work done
+        self.rows_loaded = 0
+        self.rows_rejected = 0
+        self._rejects = None
+        self._rejects_writer = None
+
+    def records(self, lines):
+        """Yields each record of the file as a dict of field name to value,
+        or as the line it couldn't be parsed from, for the rejects file."""
+
+        if self.ndjson:
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield line
+                    continue
+                yield record if isinstance(record, dict) else line
+        else:
+            reader = csv.reader(lines)
+            header = next(reader, None)
+            if header is None:
+                return
+            for fields in reader:
+                if len(fields) != len(header):
+                    yield ','.join(fields)
+                    continue
+                yield dict(zip(header, fields))
+
+    def _fields(self, record):
+        """Returns the fields of a record that are columns of the table. Each
+        JSON record names its own fields, and one with a field the table has
+        no column for is refused rather than loaded without it."""
+        fields = []
+        for field in record:
+            if field.lower() in self.columns:
+                fields.append(field)
+            elif self.ndjson:
+                raise ValueError("'{0}' has no column {1}".format(self.table_name, field))
+        if not fields:
+            raise ValueError("None of the fields of '{0}' are columns of '{1}'".format(
+                self.filename, self.table_name))
+        return fields
+
+    def _row(self, record, fields):
+        values = []
+        for field in fields:
+            value = record.get(field)
+            if isinstance(value, (dict, list)):
+                value = json.dumps(value)
+            elif not self.ndjson:
+                value = csv_value(self.columns[field.lower()], value)
+            values.append(value)
+        return tuple(values)
+
+    def _reject(self, record, error):
+        self.rows_rejected += 1
+        if self._rejects is None:
+            self._rejects = open(self.rejects_filename, 'w')
+        if not isinstance(record, dict):
+            self._rejects.write('# {0}: {1}\n'.format(error, record.rstrip('\n')))
+        elif self.ndjson:
+            record = dict(record)
+            record['_error'] = str(error)
+            self._rejects.write(json.dumps(record) + '\n')
+        else:
+            if self._rejects_writer is None:
+                self._rejects_writer = csv.DictWriter(self._rejects, list(record) + ['_error'])
+                self._rejects_writer.writeheader()
+            record = dict(record)
+            record['_error'] = str(error).splitlines()[0] if str(error) else ''
+            self._rejects_writer.writerow(record)
+
+    def _insert(self, batch, columns, tracker):
+        """Inserts a batch of (record, row) pairs. If the server refuses the
+        batch, it is split in half and each half tried again, down to single
+        rows, which are rejected."""
+
+        try:
+            self.db.bulk_insert(self.table, [row for record, row in batch], columns)
+        except Exception as e:
+            if len(batch) == 1:
+                self._reject(batch[0][0], e)
+                return
+            middle = len(batch) // 2
+            self._insert(batch[:middle], columns, tracker)
+            self._insert(batch[middle:], columns, tracker)
+            return
+        self.rows_loaded += len(batch)
+        if tracker is not None:
+            tracker.add(rows=len(batch))
+
+    def run(self, tracker=None):
+        """Loads the file, reporting rows loaded and bytes read into tracker,
+        a progress.ProgressTracker, if given. Returns the number of rows
+        loaded; rows_rejected counts those written to the rejects file."""
+
+        columns = fields = None
+        batch = []
+        try:
+            with open(self.filename, 'r') as f:
+                for record in self.records(counted_lines(f, tracker)):
+                    if not isinstance(record, dict):
+                        self._reject(record, 'could not be parsed')
+                        continue
+                    if fields is None or self.ndjson:
+                        try:
+                            record_fields = self._fields(record)
+                        except ValueError as e:
+                            if not self.ndjson:
+                                raise
+                            self._reject(record, e)
+                            continue
+                        # Records with other fields start a batch of their own
+                        if fields is None or set(record_fields) != set(fields):
+                            if batch:
+                                self._insert(batch, columns, tracker)
+                                batch = []
+                            fields = record_fields
+                            columns = [self.columns[field.lower()].name for field in fields]
+                    batch.append((record, self._row(record, fields)))
+                    if len(batch) >= self.batch_rows:
+                        self._insert(batch, columns, tracker)
+                        batch = []
+                if batch:
+                    self._insert(batch, columns, tracker)
+            if columns is not None:
+                self.db.finish_bulk_load(self.table)
+        finally:
+            if self._rejects is not None:
+                self._rejects.close()
+        return self.rows_loaded
+
+
+class ChangeApplier:
+    """Applies a CSV of changes to a table. The header names the table's
+    primary key and the columns to change, and each line gives a key and
+    the new values for that row. Every column in the header is set on every
+    row listed, with empty fields setting NULL outside of text columns. The
+    whole file is applied in one transaction, so a bad line changes nothing."""
+
+    def __init__(self, database, table_name, filename, batch_rows=5000):
+        self.db = database
+        self.table_name = table_name
+        self.filename = filename
+        self.batch_rows = batch_rows
+        self.table = database.reflect_table(table_name)
+        self.rows_staged = 0
+        self.rows_updated = 0
+
+    def _columns(self, header):
+        "Returns the primary key column and the columns to change, from the header"
+        columns = dict((column.name.lower(), column) for column in self.table.columns)
+        keys = list(self.table.primary_key.columns)
+        if len(keys) != 1:
+            raise ValueError("'{0}' needs a single column primary key".format(self.table_name))
+        unknown = [field for field in header if field.lower() not in columns]
+        if unknown:
+            raise ValueError("'{0}' has no column {1}".format(self.table_name, unknown[0]))
+        targets = [columns[field.lower()] for field in header]
+        if keys[0].name not in [column.name for column in targets]:
+            raise ValueError("The header needs the primary key, {0}".format(keys[0].name))
+        return keys[0], targets
+
+    def _batches(self, reader, positions, targets):
+        batch = []
+        for fields in reader:
+            if not fields:
+                continue
+            if len(fields) <= max(positions):
+                raise ValueError("Line {0} of '{1}' is missing fields".format(
+                    reader.line_num, self.filename))
+            batch.append(tuple(csv_value(column, fields[i])
+                               for i, column in zip(positions, targets)))
+            if len(batch) >= self.batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _staged(self, rows, tracker):
+        self.rows_staged += rows
+        if tracker is not None:
+            tracker.add(rows=rows)
+
+    def run(self, tracker=None):
+        """Stages and applies the changes, reporting rows staged and bytes
+        read into tracker, a progress.ProgressTracker, if given. Cancelling
+        rolls everything back. Returns the number of rows updated."""
+
+        with open(self.filename, 'r') as f:
+            reader = csv.reader(counted_lines(f, tracker))
+            header = next(reader, None)
+            if header is None:
+                return 0
+            key, targets = self._columns(header)
+            names = [column.name for column in targets]
+            positions = [names.index(key.name)] + \
+                    [i for i, name in enumerate(names) if name != key.name]
+            ordered = [targets[i] for i in positions]
+            self.rows_updated = self.db.apply_changes(self.table_name,
+                    [column.name for column in ordered[1:]],
+                    self._batches(reader, positions, ordered),
+                    lambda rows: self._staged(rows, tracker))
+        return self.rows_updated
@@ -14,15 +14,29 @@ import sys
 import curses
 import curses.panel
 import curses.textpad
-import curses.wrapper
 import json
 import math
 import logging as log
 import db
+import monitor
+import connections
+import schema_search
+import result_cache
+import prefetch
+import progress
+import loader
+try:
+    import async_db
+except (ImportError, SyntaxError):
+    # Needs Python 3
+    async_db = None
 import os
 import subprocess
 import argparse
-from pipes import quote
+try:
+    from shlex import quote
+except ImportError:
+    from pipes import quote
 from dateutil import parser
 from datetime import datetime, timedelta
 from sqlalchemy.exc import ProgrammingError
@@ -33,6 +47,9 @@ class DBInterface:
     ALT_KEY_ENTER = 10
     db = None
 
+    # Seconds between redraws of a progress window
+    PROGRESS_INTERVAL = 0.25
+
     def __init__(self, args):
         self.args = args
         self.win_list = []
@@ -41,14 +58,34 @@ class DBInterface:
     def fake_init(self, stdscr, args):
         """Initialize the application."""
 
-        if args.dbms == 'postgres':
+        self.connections = None
+        if args.inventory:
+            # Servers are connected to lazily, once picked from the list
+            self.connections = connections.ConnectionManager.from_inventory(
+                    args.inventory, args, args.jobs)
+        elif args.dbms == 'postgres':
             self.db = db.PostgresDatabase(args.username, args.password, args.server)
         elif args.dbms == 'mysql':
             self.db = db.MySQLDatabase(args.username, args.password, args.server)
+        elif args.dbms == 'sqlite':
+            self.db = db.SQLiteDatabase(args.server, read_only=args.read_only)
         else:
-            raise ValueError('dbms should be postgres or mysql')
+            raise ValueError('dbms should be postgres, mysql or sqlite')
+
+        # Shared by every database opened, as its entries are keyed by server
+        self.result_cache = None
+        if args.cache_mb > 0 and args.cache_ttl > 0:
+            self.result_cache = result_cache.ResultCache(args.cache_mb * 1024 * 1024, args.cache_ttl)
 
-        self.db.setup()
+        if self.db is not None:
+            self.db.setup()
+            self.db.use_result_cache(self.result_cache)
+
+        # Queries run on an event loop driven from the screens' own loops
+        self.async_pump = None
+        self._async_db = None
+        if args.use_async and async_db is not None:
+            self.async_pump = async_db.LoopPump()
 
         # Setup Curses Screen
         self.stdscr = curses.initscr()
@@ -60,9 +97,21 @@ class DBInterface:
 
         # Variables
         self.sel_cursor = (0, 0)
+        self.schema_index = None
 
         self.run()
 
+    def async_db(self):
+        """Returns an async_db.AsyncDatabase over the current database, or
+        None if --async-io wasn't given or its driver isn't installed"""
+        if self.async_pump is None or self.db is None or not async_db.available(self.db):
+            return None
+        if self._async_db is None or self._async_db.db is not self.db:
+            if self._async_db is not None:
+                self.async_pump.submit(self._async_db.close())
+            self._async_db = async_db.AsyncDatabase(self.db)
+        return self._async_db
+
     def run(self):
         """Initializes the main DBInterface screen, updating various data
         displayed throughout the screen. Also adjusts and calls for a refresh
@@ -139,12 +188,13 @@ class DBInterface:
 
         # Print Menu Tabs
         menu_width = int(width * 0.13)
-        win1, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Main Menu")
+        win1, panel1 = self.make_panel(10, menu_width, 6, (width // 2) - (menu_width // 2), "Main Menu")
         win1.addstr(first_y, 1, " [ ] Databases")
         win1.addstr(first_y + 1, 1, " [ ] SQL")
         win1.addstr(first_y + 2, 1, " [ ] Export")
         win1.addstr(first_y + 3, 1, " [ ] Import")
-        last_y = first_y + 3
+        win1.addstr(first_y + 4, 1, " [ ] Search")
+        last_y = first_y + 4
 
         self.init_main_menu_select_cursor(win1)
 
@@ -164,7 +214,16 @@ class DBInterface:
             elif c == curses.KEY_ENTER or c == self.ALT_KEY_ENTER:
                 tmp_y, tmp_x = self.sel_cursor
                 if tmp_y == first_y:
-                    self.list_databases_screen()
+                    if self.connections is not None:
+                        self.list_servers_screen()
+                    else:
+                        self.list_databases_screen()
+                    self.init_main_menu_select_cursor(win1)
+                elif tmp_y == (first_y + 4):
+                    self.schema_search_screen()
+                    self.init_main_menu_select_cursor(win1)
+                elif self.db is None:
+                    self.alert_window('Select a server under Databases first!')
                     self.init_main_menu_select_cursor(win1)
                 elif tmp_y == (first_y + 1):
                     self.sql_select_screen()
@@ -183,6 +242,73 @@ class DBInterface:
             # Update Screen
             self.refresh_screen()
 
+    def list_servers_screen(self):
+        """Screen for picking a server from the inventory. Every server is
+        asked for its databases in parallel, to show how many it holds."""
+
+        server_names = self.connections.server_names()
+        self.alert_message_window('Connecting to {0} servers...'.format(len(server_names)))
+        results = self.connections.list_databases()
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.5)
+        displayable_height = max(1, min(len(server_names), height - 16))
+        window_top_margin = 6
+        inner_top_margin = 2
+        inner_bottom_margin = 3
+        start_x = (width // 2) - (menu_width // 2)
+        server_win, panel1 = self.make_panel( \
+                displayable_height+inner_top_margin+inner_bottom_margin, \
+                menu_width, window_top_margin, start_x, "Select Server")
+        server_pad = curses.newpad(max(1, len(server_names)), menu_width)
+        server_win.addstr(inner_top_margin+displayable_height+1, 1, "Press ENTER to list databases")
+
+        for i, name in enumerate(server_names):
+            spec = self.connections.spec(name)
+            dbs, error = results[name]
+            status = "{0} databases".format(len(dbs)) if error is None else "unreachable"
+            line = " [ ] {0} ({1}@{2}) - {3}".format(name, spec['dbms'], spec['server'], status)
+            server_pad.addstr(i, 1, line[:menu_width - 4])
+
+        # Hide Cursor
+        curses.curs_set(0)
+
+        x_pos = 3
+        win_pos = 0
+        self.sel_cursor = (0, x_pos)
+        self.set_select_cursor(server_pad, self.sel_cursor)
+        curses.panel.update_panels()
+        self.refresh_screen()
+        current_page = 1
+        while 1:
+            c = self.stdscr.getch()
+            if c == curses.KEY_DOWN:
+                win_pos=min(win_pos+1,len(server_names)-1)
+                self.set_select_cursor(server_pad, (win_pos,x_pos))
+            elif c == curses.KEY_UP:
+                win_pos=max(win_pos-1,0)
+                self.set_select_cursor(server_pad, (win_pos,x_pos))
+            elif c == self.ALT_KEY_ENTER or c == curses.KEY_ENTER:
+                name = server_names[win_pos]
+                dbs, error = results[name]
+                if error is not None:
+                    self.alert_window("Failed to connect to '{0}'!".format(name))
+                    continue
+                self.db = self.connections.get(name)
+                self.db.use_result_cache(self.result_cache)
+                self.list_databases_screen()
+                self.refresh_screen()
+            elif c == self.ESC_KEY:
+                del server_pad
+                del server_win
+                del panel1
+                return
+            current_page = (win_pos // displayable_height) + 1
+            server_pad.refresh((current_page - 1) * displayable_height, 1, \
+                    inner_top_margin+window_top_margin, start_x+1, \
+                    inner_top_margin+window_top_margin+displayable_height-1, \
+                    start_x+menu_width-3)
+
     def list_databases_screen(self):
         """Screen for listing databases."""
         db_names = self.db.list_databases()
@@ -262,7 +388,7 @@ class DBInterface:
         displayable_height = 10
         window_top_margin = 6
         inner_top_margin = 3
-        inner_bottom_margin = 3
+        inner_bottom_margin = 5
         start_x = (width // 2) - (menu_width // 2)
         table_win, panel1 = self.make_panel( \
                 displayable_height+inner_top_margin+inner_bottom_margin, \
@@ -274,6 +400,10 @@ class DBInterface:
 
         table_win.addstr(inner_top_margin+displayable_height, 1, "a: add a new table")
         table_win.addstr(inner_top_margin+displayable_height+1, 1,"d: delete a table")
+        table_win.addstr(inner_top_margin+displayable_height+2, 1,"s: table statistics")
+        table_win.addstr(inner_top_margin+displayable_height+3, 1,"i: index advisor")
+        table_win.addstr(inner_top_margin+displayable_height, 24,"l: load CSV/NDJSON")
+        table_win.addstr(inner_top_margin+displayable_height+1, 24,"c: apply changes CSV")
         i = 0
         for name in table_names:
             table_pad.addstr(i,1," [ ] {}".format(name))
@@ -343,6 +473,27 @@ class DBInterface:
                     del table_win
                     return
                 self.init_main_menu_select_cursor(table_win)
+            elif c == ord('s'):
+                self.table_stats_screen()
+                self.refresh_screen()
+            elif c == ord('l'):
+                if len(table_names) == 0:
+                    self.alert_window('No tables to load into')
+                    continue
+                self.load_file_window(table_names[win_pos])
+                self.refresh_screen()
+            elif c == ord('c'):
+                if len(table_names) == 0:
+                    self.alert_window('No tables to change')
+                    continue
+                self.apply_changes_window(table_names[win_pos])
+                self.refresh_screen()
+            elif c == ord('i'):
+                if len(table_names) == 0:
+                    self.alert_window('No tables to select')
+                    continue
+                self.index_advisor_screen(table_names[win_pos])
+                self.refresh_screen()
             elif c == self.ESC_KEY:
                 del table_pad
                 del table_win
@@ -353,6 +504,253 @@ class DBInterface:
                     inner_top_margin+window_top_margin+displayable_height-1, \
                     start_x+menu_width-3)
 
+    def table_stats_screen(self):
+        """Live view of per-table throughput for the current database, showing
+        per-second rates and a sparkline of recent history."""
+
+        sample_interval = 2
+        sort_keys = ['inserts', 'updates', 'seq_scans', 'idx_scans']
+        sort_pos = 0
+        table_monitor = monitor.TableThroughputMonitor(self.db)
+        # With --async-io, samples are fetched while the screen keeps running
+        adb = self.async_db()
+        pending = None
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.77)
+        window_top_margin = 6
+        win_height = height - window_top_margin - 1
+        displayable_height = win_height - 7
+        start_x = (width // 2) - (menu_width // 2)
+        stats_win, panel1 = self.make_panel(win_height, menu_width, \
+                window_top_margin, start_x, "Table Statistics")
+        stats_win.addstr(win_height-2, 1, "o: change ordering")
+
+        row_format = "{0:<24.24} {1:>9} {2:>9} {3:>9} {4:>9} {5:>6}  {6}"
+        spark_width = max(0, menu_width - 75)
+
+        # Block for a short while on input, so the screen isn't spinning
+        self.stdscr.timeout(100)
+        last_sample = 0
+        redraw = True
+        while 1:
+            due = time.time() - last_sample >= sample_interval
+            if adb is not None:
+                if due and pending is None:
+                    pending = self.async_pump.submit(adb.table_stats())
+                self.async_pump.pump(pending)
+                due = pending is not None and pending.done()
+            if due:
+                try:
+                    counters = None
+                    if pending is not None:
+                        counters, pending = pending.result(), None
+                    table_monitor.sample(counters)
+                except Exception:
+                    self.stdscr.nodelay(1)
+                    self.alert_window('Failed to read table statistics!')
+                    del stats_win
+                    del panel1
+                    return
+                last_sample = time.time()
+                redraw = True
+
+            if redraw:
+                sort_key = sort_keys[sort_pos]
+                for y in range(2, win_height - 2):
+                    stats_win.addstr(y, 1, ' ' * (menu_width - 2))
+                stats_win.addstr(2, 1, row_format.format("Table", "ins/s", "upd/s", \
+                        "seq/s", "idx/s", "hit%", "history ({0})".format(sort_key)))
+                stats_win.addstr(3, 1, '-' * (menu_width - 2))
+                top = table_monitor.top_tables(sort_key, displayable_height)
+                for idx, (name, rates) in enumerate(top):
+                    hit_ratio = '-' if rates['hit_ratio'] is None \
+                            else "{0:.1f}".format(rates['hit_ratio'] * 100)
+                    line = row_format.format(name, \
+                            "{0:.1f}".format(rates['inserts']), \
+                            "{0:.1f}".format(rates['updates']), \
+                            "{0:.1f}".format(rates['seq_scans']), \
+                            "{0:.1f}".format(rates['idx_scans']), hit_ratio, \
+                            table_monitor.sparkline(name, sort_key, spark_width))
+                    stats_win.addstr(4 + idx, 1, line[:menu_width - 2])
+                if not top:
+                    stats_win.addstr(4, 1, "Collecting samples...")
+                stats_win.refresh()
+                redraw = False
+
+            c = self.stdscr.getch()
+            if c == ord('o'):
+                sort_pos = (sort_pos + 1) % len(sort_keys)
+                redraw = True
+            elif c == self.ESC_KEY:
+                if pending is not None:
+                    pending.cancel()
+                self.stdscr.nodelay(1)
+                del stats_win
+                del panel1
+                return
+
+    def index_advisor_screen(self, table_name):
+        """Lists the indexes on a table with their size and how often they
+        are used, flagging unused and duplicate ones, along with how often
+        the table and the other tables are scanned sequentially."""
+
+        # Tables scanned sequentially more often than this are highlighted
+        seq_scan_warning = 0.5
+
+        adb = self.async_db()
+        try:
+            if adb is not None:
+                indexes, table_stats = self.async_pump.run(adb.index_report())
+            else:
+                indexes = self.db.index_usage()
+                table_stats = self.db.table_stats()
+        except Exception:
+            self.alert_window('Failed to read index statistics!')
+            return
+        flags = monitor.flag_indexes(indexes)
+        table_indexes = sorted([index for index in indexes if index['table_name'] == table_name], \
+                key=lambda index: index['index_name'])
+        ratios = [(name, monitor.seq_scan_ratio(stats), stats['seq_scans']) \
+                for name, stats in table_stats.items()]
+        ratios = sorted([r for r in ratios if r[1] is not None], key=lambda r: r[1], reverse=True)
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.77)
+        window_top_margin = 6
+        win_height = height - window_top_margin - 1
+        start_x = (width // 2) - (menu_width // 2)
+        index_win, panel1 = self.make_panel(win_height, menu_width, \
+                window_top_margin, start_x, "Indexes on {0}".format(table_name))
+
+        stats = table_stats.get(table_name)
+        ratio = monitor.seq_scan_ratio(stats) if stats else None
+        if ratio is None:
+            summary = "No scans recorded for this table"
+        else:
+            summary = "Sequential scans: {0:.1f}% of {1:,} scans".format(ratio * 100, \
+                    (stats['seq_scans'] or 0) + (stats['idx_scans'] or 0))
+        index_win.addstr(2, 1, summary[:menu_width - 2], \
+                curses.A_REVERSE if ratio is not None and ratio >= seq_scan_warning else 0)
+
+        row_format = "{0:<24.24} {1:<24.24} {2:>10} {3:>12}  {4}"
+        index_win.addstr(4, 1, row_format.format("Index", "Columns", "Size", "Scans", "Flags")[:menu_width - 2])
+        index_win.addstr(5, 1, '-' * (menu_width - 2))
+        y = 6
+        for index in table_indexes:
+            if y >= win_height - 9:
+                break
+            problems = flags[(table_name, index['index_name'])]
+            kind = 'primary' if index['is_primary'] else 'unique' if index['is_unique'] else ''
+            size = '-' if index['size_bytes'] is None else progress.format_bytes(index['size_bytes'])
+            scans = '-' if index['scans'] is None else "{0:,}".format(index['scans'])
+            line = row_format.format(index['index_name'], ','.join(index['columns']), size, scans, \
+                    ', '.join([kind] + problems if kind else problems))
+            index_win.addstr(y, 1, line[:menu_width - 2], curses.A_REVERSE if problems else 0)
+            y += 1
+        if not table_indexes:
+            index_win.addstr(y, 1, "This table has no indexes")
+            y += 1
+
+        y += 1
+        index_win.addstr(y, 1, "Tables scanned sequentially most often:")
+        for name, table_ratio, seq_scans in ratios[:max(0, win_height - y - 3)]:
+            y += 1
+            line = "{0:<32.32} {1:>6.1f}% of scans, {2:,} sequential".format(name, table_ratio * 100, seq_scans)
+            index_win.addstr(y, 1, line[:menu_width - 2], \
+                    curses.A_REVERSE if table_ratio >= seq_scan_warning else 0)
+
+        index_win.refresh()
+        while 1:
+            c = self.stdscr.getch()
+            if c == self.ESC_KEY:
+                del index_win
+                del panel1
+                return
+
+    def build_schema_index(self):
+        """Indexes the table and column names of every database, on every
+        server when working from an inventory."""
+
+        errors = {}
+        if self.connections is not None:
+            self.alert_message_window('Indexing schemas on {0} servers...'.format( \
+                    len(self.connections.server_names())))
+            databases = {}
+            connected = self.connections.map(lambda database: database)
+            for name, (database, error) in connected.items():
+                if error is None:
+                    databases[name] = database
+                else:
+                    errors[name] = error
+        else:
+            self.alert_message_window('Indexing schemas...')
+            databases = {self.args.server: self.db}
+
+        self.schema_index, index_errors = schema_search.build_index(databases, self.args.jobs)
+        errors.update(index_errors)
+        if errors:
+            self.alert_window('Could not index {0} of the servers!'.format(len(errors)))
+
+    def schema_search_screen(self):
+        """Searches the table and column names of every database for a
+        substring, from an index built the first time this screen is used."""
+
+        if self.schema_index is None:
+            self.build_schema_index()
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.77)
+        displayable_height = height - 16
+        window_top_margin = 6
+        inner_top_margin = 2
+        inner_bottom_margin = 4
+        start_x = (width // 2) - (menu_width // 2)
+
+        query = self.text_window('Search for tables and columns named:')
+        while 1:
+            results = self.schema_index.search(query)
+            search_win, panel1 = self.make_panel( \
+                    displayable_height+inner_top_margin+inner_bottom_margin, \
+                    menu_width, window_top_margin, start_x, \
+                    "{0} matches for '{1}'".format(len(results), query))
+            search_win.addstr(inner_top_margin+displayable_height+1, 1, "/: new search")
+            search_win.addstr(inner_top_margin+displayable_height+2, 1, "r: rebuild the index")
+            search_pad = curses.newpad(max(1, len(results)), menu_width)
+            for idx, (server, database, table, column) in enumerate(results):
+                location = "{0} / {1} / {2}".format(server, database, table)
+                if column is not None:
+                    location += ".{0}".format(column)
+                search_pad.addstr(idx, 1, location[:menu_width - 4])
+
+            curses.panel.update_panels()
+            self.refresh_screen()
+            top = 0
+            while 1:
+                search_pad.refresh(top, 1, \
+                        inner_top_margin+window_top_margin, start_x+1, \
+                        inner_top_margin+window_top_margin+displayable_height-1, \
+                        start_x+menu_width-3)
+                c = self.stdscr.getch()
+                if c == curses.KEY_DOWN:
+                    top = min(top + 1, max(0, len(results) - displayable_height))
+                elif c == curses.KEY_UP:
+                    top = max(top - 1, 0)
+                elif c == ord('/'):
+                    query = self.text_window('Search for tables and columns named:')
+                    break
+                elif c == ord('r'):
+                    self.build_schema_index()
+                    break
+                elif c == self.ESC_KEY:
+                    del search_pad
+                    del search_win
+                    del panel1
+                    return
+            del search_pad
+            del search_win
+            del panel1
+
     def list_rows_screen(self,table_name):
         """Creates a menu with the rows of a table"""
 
@@ -362,7 +760,10 @@ class DBInterface:
             self.alert_window("Failed to access table. Ensure that '{0}' has a primary key.".format(table_name))
             return False
 
-        rows = self.db.list_rows(table_name)
+        # The server's estimate sizes the prefetcher, as counting would scan
+        # the whole table; the real end is found when a page comes back short
+        num_rows = self.db.estimate_rows(table_name)
+        last_page = None
 
         height, width = self.stdscr.getmaxyx()
         menu_width = int(width * 0.77)
@@ -374,10 +775,24 @@ class DBInterface:
         table_win, panel1 = self.make_panel( \
                 displayable_height+inner_top_margin+inner_bottom_margin, \
                 menu_width, window_top_margin, start_x, "Select Row")
-        max_pages = int( math.ceil( (len(rows) + 2) / displayable_height ) )
-        table_pad = curses.newpad(max_pages*displayable_height, menu_width)
+        max_pages = max(1, int( math.ceil( num_rows / float(displayable_height) ) ))
+        table_pad = curses.newpad(displayable_height, menu_width)
         table_win.box()
 
+        # Rows are fetched a page at a time, with the pages around the one
+        # shown fetched in the background
+        prefetcher = prefetch.PagePrefetcher( \
+                lambda page: self.db.list_rows_page(table_name, page * displayable_height, displayable_height), \
+                max_pages, self.args.prefetch_jobs, self.args.prefetch_pages)
+
+        def row_at(num):
+            if num < 0:
+                return None
+            page_rows = prefetcher.get(num // displayable_height)
+            if num % displayable_height < len(page_rows):
+                return page_rows[num % displayable_height]
+            return None
+
         start_col = ' # '
         stcol_len = len(start_col)
         column_width = (menu_width-stcol_len)//len(column_names)
@@ -388,14 +803,13 @@ class DBInterface:
         table_win.addstr(inner_top_margin+displayable_height, 1, "a: add a new row")
         table_win.addstr(inner_top_margin+displayable_height+1, 1,"d: delete a row")
         table_win.addstr(inner_top_margin+displayable_height+2, 1,"m: modify a row")
+        table_win.addstr(inner_top_margin+displayable_height, 24, "s: sample rows")
+        table_win.addstr(inner_top_margin+displayable_height+1, 24, "p: profile columns")
+        table_win.addstr(inner_top_margin+displayable_height+2, 24, "x/u: bulk delete/update")
 
         for idx, name in enumerate(column_names):
             table_win.addstr(2,1+idx*column_width+stcol_len,"| {}".format(name))
         table_win.addstr(3,1,'-' * ( menu_width - 2 ) )
-        for idx,row in enumerate(rows):
-            table_pad.addstr(idx,0,"{}".format(str(idx)))
-            for j,name in enumerate(column_names):
-                table_pad.addstr(idx,j*column_width+stcol_len,"| {}".format(row[name]))
 
         # Hide Cursor
         curses.curs_set(0)
@@ -404,19 +818,52 @@ class DBInterface:
         self.sel_cursor = (0, x_pos)
         curses.panel.update_panels()
         self.refresh_screen()
-        # table_pad.refresh(0,0, start_y, start_x, displayable_height, menu_width)
         current_page = 1
+        shown_page = None
         while 1:
+            if shown_page != current_page:
+                try:
+                    page_rows = prefetcher.get(current_page - 1)
+                except Exception:
+                    prefetcher.close()
+                    self.alert_window('Failed to list rows of {0}!'.format(table_name))
+                    del table_pad
+                    del table_win
+                    del panel1
+                    return
+                if len(page_rows) < displayable_height:
+                    last_page = current_page
+                    # The estimate was high and this page is past the end
+                    if not page_rows and current_page > 1:
+                        current_page = last_page = current_page - 1
+                        continue
+                elif current_page >= prefetcher.num_pages:
+                    # The estimate was low, so let the prefetcher look further
+                    prefetcher.num_pages = current_page + 1
+                first_row = (current_page - 1) * displayable_height
+                table_pad.erase()
+                for idx, row in enumerate(page_rows):
+                    table_pad.addstr(idx,0,"{}".format(str(first_row + idx)))
+                    for j,name in enumerate(column_names):
+                        table_pad.addstr(idx,j*column_width+stcol_len,"| {}".format(row[name]))
+                shown_page = current_page
+            table_pad.refresh(0, 0, \
+                    inner_top_margin+window_top_margin, start_x+1, \
+                    inner_top_margin+window_top_margin+displayable_height-1, \
+                    start_x+menu_width-2)
+
             c = self.stdscr.getch()
             if c == self.ESC_KEY:
+                prefetcher.close()
                 del table_pad
                 del table_win
                 del panel1
                 return
             elif c == curses.KEY_UP:
-                current_page = max(0,current_page-1)
+                current_page = max(1,current_page-1)
             elif c == curses.KEY_DOWN:
-                current_page = min(max_pages,current_page+1)
+                if last_page is None or current_page < last_page:
+                    current_page += 1
             elif c == ord('d'):
                 text = self.text_window(title='Please input the row you would like to delete')
                 try:
@@ -424,19 +871,26 @@ class DBInterface:
                 except ValueError:
                     self.alert_window('Row must be an integer!')
                     continue
-                if num >= len(rows):
+                try:
+                    row = row_at(num)
+                except Exception:
+                    self.alert_window('Failed to list rows of {0}!'.format(table_name))
+                    continue
+                if row is None:
                     self.alert_window('That row does not exist!')
                     continue
                 try:
-                    self.db.delete_row(table_name, rows[num])
+                    self.db.delete_row(table_name, row)
                 except ProgrammingError:
                     self.alert_window('Invalid Query!')
+                prefetcher.close()
                 del table_pad
                 del table_win
                 del panel1
                 return
             elif c == ord('a'):
                 self.add_window(table_name, column_names)
+                prefetcher.close()
                 del table_win
                 del panel1
                 return
@@ -447,14 +901,97 @@ class DBInterface:
                 except ValueError:
                     self.alert_window('Row must be an integer!')
                     continue
-                if num >= len(rows):
+                try:
+                    row = row_at(num)
+                except Exception:
+                    self.alert_window('Failed to list rows of {0}!'.format(table_name))
+                    continue
+                if row is None:
                     self.alert_window('That row does not exist!')
                     continue
-                self.modify_window(table_name, column_names, rows[num])
-            table_pad.refresh((current_page - 1) * displayable_height, 0, \
-                    inner_top_margin+window_top_margin, start_x+1, \
-                    inner_top_margin+window_top_margin+displayable_height-1, \
-                    start_x+menu_width-2)
+                # Listed rows only hold the start of wide values, and may be
+                # shared with the result cache, so edit a fresh full copy
+                self.modify_window(table_name, column_names, self.db.fetch_row(table_name, row))
+                prefetcher.invalidate()
+                shown_page = None
+            elif c == ord('x') or c == ord('u'):
+                if self.bulk_change_window(table_name, update=(c == ord('u'))):
+                    # lazily kick user back once, as the row count has changed
+                    prefetcher.close()
+                    del table_pad
+                    del table_win
+                    del panel1
+                    return
+                shown_page = None
+            elif c == ord('s') or c == ord('p'):
+                self.sample_screen(table_name, column_names, profile=(c == ord('p')))
+                self.refresh_screen()
+                shown_page = None
+
+    def bulk_change_window(self, table_name, update=False):
+        """Deletes or updates every row of a table matching a WHERE clause, in
+        chunks of rows each committed on their own, with progress shown as it
+        runs. Returns whether anything was changed."""
+
+        predicate = self.text_window(title='Change rows WHERE (SQL condition):')
+        if not predicate:
+            return False
+        assignments = None
+        if update:
+            assignments = self.text_window(title='SET (SQL assignments, e.g. a = 1, b = b + 1):')
+            if not assignments:
+                return False
+
+        self.stdscr.nodelay(0)
+        self.alert_window('PRESSING {0} AGAIN WILL {1} ROWS WHERE {2}'.format( \
+                'u' if update else 'x', 'UPDATE' if update else 'DELETE', predicate[:40]))
+        c = self.stdscr.getch()
+        self.stdscr.nodelay(1)
+        if c != ord('u' if update else 'x'):
+            return False
+
+        def change(tracker):
+            for changed in self.db.change_rows_chunked(table_name, predicate, assignments, \
+                    self.args.chunk_rows, self.args.chunk_pause):
+                tracker.add(rows=changed)
+
+        job = self.progress_screen("{0} {1}".format('Updating' if update else 'Deleting', table_name), \
+                change, unit='rows')
+        changed = job.tracker.rows
+        if isinstance(job.error, progress.Cancelled):
+            self.alert_window('Cancelled after changing {0:,} rows'.format(changed))
+        elif job.error is not None:
+            self.alert_window('Failed after changing {0:,} rows: {1}'.format(changed, job.error))
+        else:
+            self.alert_window('Changed {0:,} rows'.format(changed))
+        return changed > 0
+
+    def sample_screen(self, table_name, column_names, profile=False):
+        """Shows a random sample of a table's rows, or a profile of its
+        columns, without reading the whole table."""
+
+        self.alert_message_window('Sampling {0}...'.format(table_name))
+        try:
+            rows = self.db.sample_rows(table_name, self.args.sample_rows)
+            if profile:
+                profiles = self.db.column_profile(table_name, rows)
+        except Exception:
+            self.alert_window('Failed to sample {0}!'.format(table_name))
+            return
+
+        if not profile:
+            self.query_results_screen(column_names, [[row[name] for name in column_names] for row in rows], \
+                    "Sample of {0} rows from {1}".format(len(rows), table_name))
+            return
+
+        lines = []
+        for p in profiles:
+            top = ', '.join("{0} ({1:.0f}%)".format(value, frac * 100) for value, frac in p['top'])
+            null_frac = '-' if p['null_frac'] is None else "{0:.1f}%".format(p['null_frac'] * 100)
+            lines.append([p['column'], null_frac, "{0:,}".format(p['distinct']), \
+                    p['min'], p['max'], top, p['source']])
+        self.query_results_screen(['column', 'nulls', 'distinct', 'min', 'max', 'top values', 'from'], \
+                lines, "Profile of {0}".format(table_name))
 
     def sql_select_screen(self):
         """Allows the user to enter a SQL query to be submitted to the server."""
@@ -479,12 +1016,15 @@ class DBInterface:
         text = curses.textpad.Textbox(edit_win).edit()
         del edit_win
 
-        # TODO: Retrieve whatever the query gives back, and display it
         try:
-            self.db.execute(text)
-            alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Executed SQL!")
+            columns, rows = self.db.query(text)
         except Exception:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Failed to execute SQL!")
+        else:
+            if columns:
+                self.query_results_screen(columns, rows)
+                return
+            alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Executed SQL!")
 
         curses.panel.update_panels()
         self.stdscr.refresh()
@@ -497,6 +1037,51 @@ class DBInterface:
                 break
         return
 
+    def query_results_screen(self, columns, rows, title=None):
+        """Shows the rows returned by a query, one line per row."""
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.77)
+        displayable_height = height - 16
+        window_top_margin = 6
+        inner_top_margin = 4
+        inner_bottom_margin = 2
+        start_x = (width // 2) - (menu_width // 2)
+        if title is None:
+            title = "{0} rows".format(len(rows))
+            if self.result_cache is not None:
+                title += " (cache: {0} hits, {1} misses)".format(self.result_cache.hits, self.result_cache.misses)
+        results_win, panel1 = self.make_panel( \
+                displayable_height+inner_top_margin+inner_bottom_margin, \
+                menu_width, window_top_margin, start_x, title)
+        column_width = max(1, (menu_width - 2) // len(columns))
+        header = ''.join("| {0}".format(name)[:column_width].ljust(column_width) for name in columns)
+        results_win.addstr(2, 1, header[:menu_width - 2])
+        results_win.addstr(3, 1, '-' * (menu_width - 2))
+        results_pad = curses.newpad(max(1, len(rows)), menu_width)
+        for idx, row in enumerate(rows):
+            line = ''.join("| {0}".format(value)[:column_width].ljust(column_width) for value in row)
+            results_pad.addstr(idx, 1, line[:menu_width - 3])
+
+        curses.panel.update_panels()
+        self.refresh_screen()
+        top = 0
+        while 1:
+            results_pad.refresh(top, 1, \
+                    inner_top_margin+window_top_margin, start_x+1, \
+                    inner_top_margin+window_top_margin+displayable_height-1, \
+                    start_x+menu_width-3)
+            c = self.stdscr.getch()
+            if c == curses.KEY_DOWN:
+                top = min(top + 1, max(0, len(rows) - displayable_height))
+            elif c == curses.KEY_UP:
+                top = max(top - 1, 0)
+            elif c == self.ESC_KEY or c == curses.KEY_ENTER or c == self.ALT_KEY_ENTER:
+                del results_pad
+                del results_win
+                del panel1
+                return
+
     def export_select_screen(self):
         """Allows the user to enter a file to export SQL to."""
 
@@ -572,30 +1157,56 @@ class DBInterface:
             choice_win.refresh()
             self.refresh_screen()
 
+    def export_database(self, selection, filename, title):
+        """Dumps a database, or every database when selection is None, from the
+        server currently connected to, which is the one picked from the
+        inventory when there is one. Returns as dump_with_progress does."""
+
+        database = self.db
+        if isinstance(database, db.PostgresDatabase):
+            tool = "pg_dump {0}".format(quote(selection)) if selection else "pg_dumpall"
+            command = "{0} --username={1} --host={2} > {3} 2>/dev/null".format(tool, \
+                    quote(database._username), quote(database._hostname), quote(filename))
+            # TODO: Test this!
+            # You can use a .pgpass in the home dir of the account that this will run to supply the password
+            os.system("echo {0} > ~/.pgpass".format(quote("{0}:*:*:{1}:{2}".format( \
+                    database._hostname, database._username, database._password))))
+            os.system("chmod 600 ~/.pgpass")
+            try:
+                return self.dump_with_progress(command, filename, title)
+            finally:
+                os.system("rm ~/.pgpass")
+        elif isinstance(database, db.MySQLDatabase):
+            target = quote(selection) if selection else "--all-databases"
+            command = "mysqldump {0} -u{1} -p{2} -h{3} > {4} 2>/dev/null".format(target, \
+                    quote(database._username), quote(database._password), \
+                    quote(database._hostname), quote(filename))
+        elif isinstance(database, db.SQLiteDatabase):
+            command = "sqlite3 {0} .dump > {1} 2>/dev/null".format( \
+                    quote(selection or database._database), quote(filename))
+        elif database is None:
+            raise ValueError('Pick a server before exporting')
+        else:
+            raise ValueError("Don't know how to export from {0}".format(type(database).__name__))
+        return self.dump_with_progress(command, filename, title)
+
     def export_all_databases(self, filename):
         """Exports all databases on the server to a specified filename."""
 
         height, width = self.stdscr.getmaxyx()
 
-        mysql_command = "mysqldump --all-databases -u{0} -p{1} -h{2} > {3} 2>/dev/null".format(args.username, args.password, args.server, filename)
-
-        # TODO: Test this!
-        postgres_command = "pg_dumpall --username={0} --host={1} > {2} 2>/dev/null".format(args.username, args.server, filename)
-
-        if self.args.dbms == 'postgres':
-            # TODO: Test this!
-            # You can use a .pgpass in the home dir of the account that this will run to supply the password
-            os.system("echo {0}:*:*:{1}:{2} > ~/.pgpass".format(args.server, args.username, args.password))
-            os.system("chmod 600 ~/.pgpass")
-            ret = os.system(postgres_command)
-            os.system("rm ~/.pgpass")
-        elif self.args.dbms == 'mysql':
-            ret = os.system(mysql_command)
+        try:
+            ret = self.export_database(None, filename, "Exporting all databases")
+        except ValueError as e:
+            self.alert_window(str(e))
+            return
 
         menu_width = int(width * 0.33)
 
         if ret == 0:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Exported all databases!")
+        elif ret is None:
+            alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Cancelled exporting all databases!")
         else:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Failed to export all databases!")
 
@@ -658,25 +1269,18 @@ class DBInterface:
     def export_database_selection(self, selection, filename):
         height, width = self.stdscr.getmaxyx()
 
-        mysql_command = "mysqldump {0} -u{1} -p{2} -h{3} > {4} 2>/dev/null".format(selection, args.username, args.password, args.server, filename)
-        postgres_command = "pg_dump --username={0} --host={1} {2} > {3} 2>/dev/null".format(args.username, args.server, selection, filename)
-        
-        self.alert_window("Attempting Export!")
-
-        if self.args.dbms == 'postgres':
-            # TODO: Test this!
-            # You can use a .pgpass in the home dir of the account that this will run to supply the password
-            os.system("echo {0}:*:*:{1}:{2} > ~/.pgpass".format(args.server, args.username, args.password))
-            os.system("chmod 600 ~/.pgpass")
-            ret = os.system(postgres_command)
-            os.system("rm ~/.pgpass")
-        elif self.args.dbms == 'mysql':
-            ret = os.system(mysql_command)
+        try:
+            ret = self.export_database(selection, filename, "Exporting database '{0}'".format(selection))
+        except ValueError as e:
+            self.alert_window(str(e))
+            return
 
         menu_width = int(width * 0.33)
 
         if ret == 0:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Exported database '{0}'!".format(selection))
+        elif ret is None:
+            alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Cancelled exporting database '{0}'!".format(selection))
         else:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Failed to export database '{0}'!".format(selection))
 
@@ -719,25 +1323,36 @@ class DBInterface:
         return
 
     def import_sql(self, filename):
-        """Imports a SQL file and submits it to the server."""
+        """Imports a SQL file and submits it to the server, a statement at a
+        time so that progress can be shown and the import cancelled."""
 
         try:
-            f = open(filename, "r")
-            data = f.read()
-            f.close()
-        except Exception as e:
+            total_bytes = os.path.getsize(filename)
+        except OSError as e:
             self.alert_window(str(e))
             return
 
+        # MySQL dumps escape quotes in strings with backslashes
+        backslash_escapes = isinstance(self.db, db.MySQLDatabase)
+
+        def run_import(tracker):
+            with open(filename, "r") as f:
+                for statement, size in db.split_statements(f, backslash_escapes):
+                    self.db.execute(statement)
+                    tracker.add(rows=1, nbytes=size)
+
+        job = self.progress_screen("Importing '{0}'".format(filename), run_import, \
+                total_bytes=total_bytes, unit='statements')
+
         height, width = self.stdscr.getmaxyx()
 
         menu_width = int(width * 0.33)
 
-        try:
-            self.alert_window("Attempting Import!")
-            self.db.execute(data)
+        if job.error is None:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Imported SQL from '{0}'!".format(filename))
-        except Exception as e:
+        elif isinstance(job.error, progress.Cancelled):
+            alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Cancelled import after {0} statements!".format(job.tracker.rows))
+        else:
             alert_win, panel1 = self.make_panel(9, menu_width, 6, (width // 2) - (menu_width // 2), "Failed to import SQL from '{0}'!".format(filename))
 
         curses.panel.update_panels()
@@ -751,6 +1366,120 @@ class DBInterface:
                 break
         return
 
+    def load_file_window(self, table_name):
+        """Loads a CSV or NDJSON file into a table, showing progress through
+        the file. Rows the server refuses are written to a rejects file."""
+
+        filename = self.text_window('Path of the CSV or NDJSON file to load into {0}:'.format(table_name))
+        if not filename:
+            return
+        try:
+            total_bytes = os.path.getsize(filename)
+            table_loader = loader.TableLoader(self.db, table_name, filename)
+        except Exception as e:
+            self.alert_window(str(e)[:60])
+            return
+
+        job = self.progress_screen("Loading '{0}' into {1}".format(os.path.basename(filename), table_name), \
+                table_loader.run, total_bytes=total_bytes)
+        if isinstance(job.error, progress.Cancelled):
+            message = 'Cancelled after loading {0:,} rows'.format(table_loader.rows_loaded)
+        elif job.error is not None:
+            message = 'Failed after loading {0:,} rows: {1}'.format(table_loader.rows_loaded, job.error)
+        else:
+            message = 'Loaded {0:,} rows'.format(table_loader.rows_loaded)
+        if table_loader.rows_rejected:
+            message += ', rejected {0:,} (see {1})'.format(table_loader.rows_rejected, \
+                    table_loader.rejects_filename)
+        self.alert_window(message[:80])
+
+    def apply_changes_window(self, table_name):
+        """Applies a CSV of changes, keyed by primary key, to a table in one
+        transaction, showing progress while the changes are staged."""
+
+        filename = self.text_window('Path of the changes CSV (key, column, ...) for {0}:'.format(table_name))
+        if not filename:
+            return
+        try:
+            total_bytes = os.path.getsize(filename)
+            applier = loader.ChangeApplier(self.db, table_name, filename)
+        except Exception as e:
+            self.alert_window(str(e)[:60])
+            return
+
+        job = self.progress_screen("Applying '{0}' to {1}".format(os.path.basename(filename), table_name), \
+                applier.run, total_bytes=total_bytes)
+        if isinstance(job.error, progress.Cancelled):
+            message = 'Cancelled; no rows were changed'
+        elif job.error is not None:
+            message = 'Failed, so no rows were changed: {0}'.format(job.error)
+        else:
+            message = 'Updated {0:,} of {1:,} rows listed'.format(applier.rows_updated, applier.rows_staged)
+        self.alert_window(message[:80])
+
+    def dump_with_progress(self, command, filename, title):
+        """Runs a dump command writing to filename, showing how much it has
+        written so far. Returns its exit status, -1 if it couldn't be run, or
+        None if it was cancelled."""
+
+        def dump(tracker):
+            # exec, so that terminating the process stops the dump rather
+            # than the shell around it
+            process = subprocess.Popen("exec " + command, shell=True)
+            try:
+                while process.poll() is None:
+                    time.sleep(0.2)
+                    if os.path.exists(filename):
+                        tracker.set(nbytes=os.path.getsize(filename))
+            except progress.Cancelled:
+                process.terminate()
+                process.wait()
+                raise
+            return process.returncode
+
+        job = self.progress_screen(title, dump, unit=None)
+        if isinstance(job.error, progress.Cancelled):
+            return None
+        if job.error is not None:
+            return -1
+        return job.result
+
+    def progress_screen(self, title, func, total_rows=None, total_bytes=None, unit='rows'):
+        """Runs func(tracker) on a background thread while showing the
+        progress it reports into tracker, a progress.ProgressTracker. The
+        window is redrawn a few times a second and keyboard input is still
+        read, so ESC cancels the job the next time it reports progress.
+        Returns the finished progress.BackgroundJob."""
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.5)
+        progress_win, panel1 = self.make_panel(8, menu_width, 6, (width // 2) - (menu_width // 2), title)
+        progress_win.addstr(6, 1, "ESC: cancel")
+        panel1.top()
+        self.refresh_screen()
+
+        tracker = progress.ProgressTracker(title, total_rows, total_bytes, unit)
+        job = progress.BackgroundJob(func, tracker).start()
+
+        # Block for a short while on input, so the screen isn't spinning
+        self.stdscr.timeout(100)
+        last_draw = 0
+        while not job.done():
+            if time.time() - last_draw >= self.PROGRESS_INTERVAL:
+                for y, line in enumerate(tracker.status_lines(menu_width - 2)):
+                    progress_win.addstr(3 + y, 1, line.ljust(menu_width - 2))
+                progress_win.refresh()
+                last_draw = time.time()
+            c = self.stdscr.getch()
+            if c == self.ESC_KEY and not tracker.cancelled():
+                tracker.cancel()
+                progress_win.addstr(6, 1, "Cancelling...")
+        self.stdscr.nodelay(1)
+        del progress_win
+        del panel1
+        self.refresh_screen()
+        return job
+
     def add_window(self, table_name, column_names):
         _, width = self.stdscr.getmaxyx()
         menu_width = int(width * 0.77)
@@ -819,7 +1548,7 @@ class DBInterface:
             table_win.addstr(1,idx*column_width,"| {}".format(name))
         table_win.addstr(2,1,'-' * (menu_width-2))
         for j,name in enumerate(column_names):
-            table_win.addstr(3,j*column_width+1,"| {}".format(row[name]))
+            table_win.addstr(3,j*column_width+1,"| {}".format(row[name])[:column_width])
 
         #set initial selection
         col_pos = 0
@@ -875,6 +1604,19 @@ class DBInterface:
         del alert_win
         self.refresh_screen()
 
+    def alert_message_window(self, msg):
+        """Shows a message without waiting for it to be dismissed, for use
+        while something slow happens."""
+
+        height, width = self.stdscr.getmaxyx()
+        menu_width = int(width * 0.5)
+        alert_win, panel1 = self.make_panel(5, int(menu_width), 6, int((width / 2) - (menu_width / 2)), "")
+        alert_win.addstr(2, 1, msg[:menu_width - 2])
+        panel1.top()
+        self.refresh_screen()
+        alert_win.refresh()
+        del alert_win
+
     def text_window(self,title='Enter Text Here:'):
         first_y = 3
         win_height = 6
@@ -930,11 +1672,39 @@ class DBInterface:
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(prog='climyadmin')
-    parser.add_argument('-u', '--username', required=True, metavar='USER', help='username for accessing your database server')
-    parser.add_argument('-p', '--password', required=True, metavar='PASS', help='password for accessing your database server')
-    parser.add_argument('-s', '--server', default='localhost', metavar='HOST', help='hostname for your database server')
-    parser.add_argument('-dbms', '--dbms', choices=['postgres', 'mysql'], \
-            required=True, metavar='DBTYPE', help='dbms chooses your database')
+    parser.add_argument('-u', '--username', metavar='USER', help='username for accessing your database server')
+    parser.add_argument('-p', '--password', metavar='PASS', help='password for accessing your database server')
+    parser.add_argument('-s', '--server', default='localhost', metavar='HOST', help='hostname for your database server, ' \
+            'or the database file for sqlite')
+    parser.add_argument('-dbms', '--dbms', choices=['postgres', 'mysql', 'sqlite'], \
+            metavar='DBTYPE', help='dbms chooses your database')
+    parser.add_argument('-i', '--inventory', metavar='FILE', help='JSON file listing many servers to pick from, ' \
+            'whose entries default to the values above')
+    parser.add_argument('-j', '--jobs', type=int, default=8, metavar='N', help='servers to talk to at once (defaults to 8)')
+    parser.add_argument('--prefetch-jobs', type=int, default=2, metavar='N', help='pages of rows fetched ' \
+            'at once in the background while browsing a table (defaults to 2)')
+    parser.add_argument('--prefetch-pages', type=int, default=16, metavar='N', help='pages of rows kept ' \
+            'around while browsing a table (defaults to 16)')
+    parser.add_argument('--sample-rows', type=int, default=200, metavar='N', help='rows read when ' \
+            'sampling or profiling a table (defaults to 200)')
+    parser.add_argument('--chunk-rows', type=int, default=1000, metavar='N', help='rows changed per ' \
+            'transaction by bulk deletes and updates (defaults to 1000)')
+    parser.add_argument('--chunk-pause', type=float, default=0.1, metavar='SECS', help='pause between ' \
+            'the chunks of bulk deletes and updates (defaults to 0.1)')
+    parser.add_argument('--cache-mb', type=int, default=32, metavar='MB', help='memory for caching query results, ' \
+            '0 to disable (defaults to 32)')
+    parser.add_argument('--cache-ttl', type=int, default=60, metavar='SECS', help='seconds a cached result is ' \
+            'reused for (defaults to 60)')
+    parser.add_argument('--async-io', dest='use_async', action='store_true', help='run monitoring and catalog ' \
+            'queries concurrently on an event loop (needs Python 3 and asyncpg, aiomysql or aiosqlite)')
+    parser.add_argument('--read-only', action='store_true', help='open a sqlite file without ever writing to it')
     args = parser.parse_args()
+    if args.use_async and async_db is None:
+        parser.error('--async-io needs Python 3')
+    if args.dbms == 'sqlite':
+        if args.server == 'localhost':
+            parser.error('-s should name the database file for sqlite')
+    elif not args.inventory and not (args.username and args.password and args.dbms):
+        parser.error('-u, -p and --dbms are required without an --inventory')
 
     shm = DBInterface(args)
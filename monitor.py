@@ -0,0 +1,162 @@
+"""monitor.py
+
+Samples the per-table activity counters exposed by the database server and
+turns them into per-second rates, keeping a short rolling history of each
+rate for every table so it can be drawn as a sparkline."""
+
+
+import time
+from collections import deque
+
+
+class TableThroughputMonitor:
+    # Cumulative counters that are turned into per-second rates
+    RATE_KEYS = ['inserts', 'updates', 'deletes', 'seq_scans', 'idx_scans']
+
+    # Characters used to draw sparklines, from lowest to highest
+    SPARK_CHARS = ' .:-=+*#%@'
+
+    def __init__(self, database, history_length=60):
+        self.db = database
+        self.history_length = history_length
+
+        # table_name -> {rate_key: deque of rates}
+        self.history = {}
+
+        # table_name -> {rate_key: latest rate}
+        self.latest = {}
+
+        self._last_counters = None
+        self._last_time = None
+
+    def sample(self, counters=None):
+        """Pulls a fresh set of counters from the server and records the rate
+        of change since the previous sample. The first call only establishes
+        a baseline. counters, from Database.table_stats(), can be passed in
+        when they were fetched some other way."""
+
+        now = time.time()
+        if counters is None:
+            counters = self.db.table_stats()
+
+        if self._last_counters is not None and now > self._last_time:
+            elapsed = now - self._last_time
+            for table_name, current in counters.items():
+                previous = self._last_counters.get(table_name)
+                if previous is None:
+                    continue
+                self.record(table_name, self.compute_rates(previous, current, elapsed))
+
+            # Forget about tables that have been dropped
+            for table_name in list(self.history.keys()):
+                if table_name not in counters:
+                    del self.history[table_name]
+                    del self.latest[table_name]
+
+        self._last_counters = counters
+        self._last_time = now
+
+    def compute_rates(self, previous, current, elapsed):
+        """Returns the per-second rate of each counter between two samples,
+        along with the buffer cache hit ratio over the interval."""
+
+        rates = {}
+        for key in self.RATE_KEYS:
+            # A counter going backwards means the statistics were reset
+            delta = max(0, (current[key] or 0) - (previous[key] or 0))
+            rates[key] = delta / float(elapsed)
+
+        rates['hit_ratio'] = None
+        if current['blks_hit'] is not None and previous['blks_hit'] is not None:
+            hits = max(0, current['blks_hit'] - previous['blks_hit'])
+            reads = max(0, current['blks_read'] - previous['blks_read'])
+            if hits + reads:
+                rates['hit_ratio'] = hits / float(hits + reads)
+        return rates
+
+    def record(self, table_name, rates):
+        """Appends a set of rates to a table's history, dropping the oldest
+        entry once history_length samples have been kept."""
+
+        if table_name not in self.history:
+            self.history[table_name] = {
+                key: deque(maxlen=self.history_length) for key in rates}
+        for key, value in rates.items():
+            self.history[table_name][key].append(value)
+        self.latest[table_name] = rates
+
+    def top_tables(self, key, n=None):
+        """Returns (table_name, rates) pairs ordered by the latest value of
+        the given rate, busiest first."""
+
+        ordered = sorted(self.latest.items(),
+                         key=lambda item: item[1][key] or 0, reverse=True)
+        rates = [(name, dict(latest)) for name, latest in ordered]
+        return rates[:n] if n is not None else rates
+
+    def sparkline(self, table_name, key, width):
+        """Renders the most recent width samples of a rate as a string of
+        characters scaled against the largest value in view."""
+
+        values = list(self.history.get(table_name, {}).get(key, []))[-width:]
+        values = [v or 0 for v in values]
+        if not values:
+            return ''
+
+        peak = max(values)
+        top = len(self.SPARK_CHARS) - 1
+        if peak <= 0:
+            return self.SPARK_CHARS[0] * len(values)
+        return ''.join(self.SPARK_CHARS[int(round((v / float(peak)) * top))]
+                       for v in values)
+
+
+def flag_indexes(indexes):
+    """Returns a dict of (table_name, index_name) to a list of problems with
+    each of the given Database.index_usage() indexes: 'unused' for indexes
+    known never to have been scanned, and 'duplicate of X' for indexes whose
+    columns are the same as, or a leading part of, another index X on the
+    same table with the same predicate. Primary and unique indexes are never
+    flagged, as they enforce constraints. Usage that isn't tracked, such as
+    with performance_schema off in MySQL, isn't taken as unused."""
+
+    flags = {}
+    by_table = {}
+    for index in indexes:
+        flags[(index['table_name'], index['index_name'])] = []
+        by_table.setdefault(index['table_name'], []).append(index)
+
+    for table_name, table_indexes in by_table.items():
+        for index in table_indexes:
+            if index['is_primary'] or index['is_unique']:
+                continue
+            problems = flags[(table_name, index['index_name'])]
+            # None means the server doesn't track usage, as with SQLite
+            if index['scans'] is not None and not index['scans']:
+                problems.append('unused')
+
+            columns = index['columns']
+            # An index whose columns couldn't all be read is no one's prefix
+            if not columns:
+                continue
+            for other in table_indexes:
+                if other is index or other['columns'][:len(columns)] != columns \
+                        or other['predicate'] != index['predicate']:
+                    continue
+                # Of two identical plain indexes, only flag the later named
+                if other['columns'] == columns and not (other['is_primary'] or other['is_unique']) \
+                        and other['index_name'] > index['index_name']:
+                    continue
+                problems.append('duplicate of {0}'.format(other['index_name']))
+                break
+    return flags
+
+
+def seq_scan_ratio(stats):
+    """Returns the fraction of a table's scans from Database.table_stats()
+    that were sequential, or None if it hasn't been scanned."""
+
+    total = (stats['seq_scans'] or 0) + (stats['idx_scans'] or 0)
+    if total == 0:
+        return None
+    return (stats['seq_scans'] or 0) / float(total)
@@ -0,0 +1,127 @@
+"""prefetch.py
+
+Fetches pages of rows ahead of the row browser on background threads, so that
+scrolling doesn't stall on a round trip to the server at every page boundary.
+How far ahead depends on which way and how fast the user is scrolling, and on
+how long pages have been taking to arrive."""
+
+
+import math
+import time
+import threading
+from multiprocessing.pool import ThreadPool
+
+
+class PagePrefetcher:
+
+    def __init__(self, fetch_page, num_pages, max_in_flight=2, max_pages=16,
+                 max_ahead=4):
+        """fetch_page(page) returns the rows of a page, counting from 0. It is
+        called from background threads, so it must be thread safe."""
+
+        self.fetch_page = fetch_page
+        self.num_pages = num_pages
+        self.max_in_flight = max_in_flight
+        self.max_pages = max_pages
+        self.max_ahead = max_ahead
+
+        self._pages = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPool(max_in_flight)
+
+        # Bumped by invalidate(), so fetches started before it are dropped
+        self._generation = 0
+
+        # Recent (time, page) positions, for the scrolling velocity
+        self._positions = []
+        # Moving average of how long a fetch takes, in seconds
+        self._fetch_time = 0.1
+        self._current = 0
+
+    def _fetch(self, page, generation):
+        start = time.time()
+        try:
+            rows = self.fetch_page(page)
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._in_flight.pop(page, None)
+        with self._lock:
+            self._fetch_time = 0.8 * self._fetch_time + 0.2 * (time.time() - start)
+            if generation == self._generation:
+                self._pages[page] = rows
+                self._evict()
+        return rows
+
+    def _evict(self):
+        # Drops the cached pages farthest from the one being viewed
+        while len(self._pages) > self.max_pages:
+            farthest = max(self._pages, key=lambda page: abs(page - self._current))
+            del self._pages[farthest]
+
+    def get(self, page):
+        """Returns the rows of a page, waiting for it if it's being fetched
+        and fetching it on this thread if it isn't, then prefetches the pages
+        the user is likely to want next."""
+
+        self._note_position(page)
+        with self._lock:
+            rows = self._pages.get(page)
+            pending = self._in_flight.get(page)
+            generation = self._generation
+        if rows is None:
+            if pending is not None:
+                rows = pending.get()
+            else:
+                rows = self._fetch(page, generation)
+        self._prefetch(page)
+        return rows
+
+    def _note_position(self, page):
+        now = time.time()
+        with self._lock:
+            self._current = page
+            self._positions.append((now, page))
+            # Only the last couple of seconds say how fast we're scrolling
+            self._positions = [p for p in self._positions if now - p[0] < 2][-10:]
+
+    def velocity(self):
+        "Returns the scrolling speed in pages per second, negative going up"
+        with self._lock:
+            if len(self._positions) < 2:
+                return 0.0
+            (first_time, first_page), (last_time, last_page) = self._positions[0], self._positions[-1]
+        if last_time == first_time:
+            return 0.0
+        return (last_page - first_page) / float(last_time - first_time)
+
+    def _prefetch(self, page):
+        """Queues the pages in the direction of travel that would be reached
+        before they could arrive, at least one, and one page behind."""
+
+        velocity = self.velocity()
+        direction = -1 if velocity < 0 else 1
+        with self._lock:
+            ahead = int(math.ceil(abs(velocity) * self._fetch_time)) + 1
+            wanted = [page + direction * n for n in range(1, min(ahead, self.max_ahead) + 1)]
+            wanted.append(page - direction)
+            for target in wanted:
+                if len(self._in_flight) >= self.max_in_flight:
+                    break
+                if 0 <= target < self.num_pages and target not in self._pages \
+                        and target not in self._in_flight:
+                    self._in_flight[target] = self._pool.apply_async( \
+                            self._fetch, (target, self._generation))
+
+    def invalidate(self, num_pages=None):
+        "Forgets every page, after the rows have changed"
+        with self._lock:
+            self._generation += 1
+            self._pages = {}
+            self._in_flight = {}
+            if num_pages is not None:
+                self.num_pages = num_pages
+
+    def close(self):
+        self._pool.terminate()
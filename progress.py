@@ -0,0 +1,146 @@
+"""progress.py
+
+Progress reporting for long running operations. A job runs on a background
+thread and reports the rows and bytes it has handled into a ProgressTracker,
+which the interface reads from whenever it redraws, so the job never waits on
+the screen and the screen never waits on the job. A tracker can be cancelled,
+which stops the job the next time it reports in."""
+
+
+import time
+import threading
+
+
+class Cancelled(Exception):
+    "Raised in a job reporting into a ProgressTracker that has been cancelled"
+    pass
+
+
+def format_bytes(num):
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(num) < 1024:
+            return '{0:.1f}{1}'.format(num, unit)
+        num /= 1024.0
+    return '{0:.1f}TB'.format(num)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return '{0}h{1:02d}m'.format(seconds // 3600, (seconds % 3600) // 60)
+    return '{0}m{1:02d}s'.format(seconds // 60, seconds % 60)
+
+
+class ProgressTracker:
+
+    def __init__(self, label, total_rows=None, total_bytes=None, unit='rows'):
+        self.label = label
+        self.unit = unit
+        self.total_rows = total_rows
+        self.total_bytes = total_bytes
+        self.rows = 0
+        self.bytes = 0
+        self.start_time = time.time()
+        self.end_time = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, rows=0, nbytes=0):
+        """Counts rows and bytes as handled. Raises Cancelled if the job has
+        been cancelled, so reporting in doubles as the cancellation check."""
+        with self._lock:
+            self.rows += rows
+            self.bytes += nbytes
+        self.check()
+
+    def set(self, rows=None, nbytes=None):
+        "Sets the running totals, for jobs that can only observe them"
+        with self._lock:
+            if rows is not None:
+                self.rows = rows
+            if nbytes is not None:
+                self.bytes = nbytes
+        self.check()
+
+    def check(self):
+        if self._cancelled.is_set():
+            raise Cancelled(self.label)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def finish(self):
+        self.end_time = time.time()
+
+    def snapshot(self):
+        """Returns the totals along with elapsed seconds, rows and bytes per
+        second, the fraction done and the seconds left, where known."""
+
+        with self._lock:
+            rows, nbytes = self.rows, self.bytes
+        elapsed = (self.end_time or time.time()) - self.start_time
+        info = {'rows': rows, 'bytes': nbytes, 'elapsed': elapsed,
+                'rows_per_sec': rows / elapsed if elapsed > 0 else 0.0,
+                'bytes_per_sec': nbytes / elapsed if elapsed > 0 else 0.0,
+                'fraction': None, 'eta': None}
+
+        # Bytes are the better measure of how much is left, when known
+        if self.total_bytes:
+            info['fraction'] = min(1.0, nbytes / float(self.total_bytes))
+        elif self.total_rows:
+            info['fraction'] = min(1.0, rows / float(self.total_rows))
+        if info['fraction']:
+            info['eta'] = elapsed * (1 - info['fraction']) / info['fraction']
+        return info
+
+    def status_lines(self, width):
+        """Returns a progress bar, if the total is known, and a line of
+        throughput figures, each fitting in width characters."""
+
+        info = self.snapshot()
+        figures = '{0} ({1}/s)  elapsed {2}'.format(format_bytes(info['bytes']),
+            format_bytes(info['bytes_per_sec']), format_duration(info['elapsed']))
+        # Jobs that only count bytes have no unit
+        if self.unit is not None:
+            figures = '{0:,} {1} ({2:,.0f}/s)  {3}'.format(
+                info['rows'], self.unit, info['rows_per_sec'], figures)
+        if info['eta'] is not None and self.end_time is None:
+            figures += '  eta {0}'.format(format_duration(info['eta']))
+
+        if info['fraction'] is None:
+            return [figures[:width]]
+        bar_width = max(0, width - 10)
+        bar = '=' * int(info['fraction'] * bar_width)
+        return ['{0:5.1f}% |{1}>'.format(info['fraction'] * 100, bar)[:width],
+                figures[:width]]
+
+
+class BackgroundJob:
+    """Runs func(tracker) on a thread, keeping its return value or the
+    exception it raised."""
+
+    def __init__(self, func, tracker):
+        self.func = func
+        self.tracker = tracker
+        self.result = None
+        self.error = None
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+
+    def _run(self):
+        try:
+            self.result = self.func(self.tracker)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.tracker.finish()
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def done(self):
+        return not self._thread.is_alive()
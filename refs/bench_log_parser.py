@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+"""bench_log_parser.py [options]
+
+Measures how many access log lines per second simple_log_consumer.py can
+parse, comparing the previous per-line path (re.search on the pattern string
+plus a dateutil parse of every timestamp) against AccessLogParser."""
+
+
+import re
+import time
+import random
+from optparse import OptionParser
+from datetime import datetime, timedelta
+
+from simple_log_consumer import (SimpleHTTPMonitor, AccessLogParser,
+                                 date_to_datetime_utc, datetime_utc_to_epoch,
+                                 parse_request_for_section)
+
+
+def legacy_parse(line, regex, labels):
+    """The per-line parsing done by renew_stats before AccessLogParser."""
+
+    match = re.search(regex, line)
+    if match is None:
+        return None
+
+    info = dict(zip(labels, match.groups()))
+    info['date_utc'] = date_to_datetime_utc(info['date_utc'])
+    info['epoch'] = datetime_utc_to_epoch(info['date_utc'])
+    info['section'] = parse_request_for_section(info['request'])
+    return info
+
+
+def generate_lines(num_lines, log_format, hits_per_second):
+    """Generates synthetic log lines in the given format, with roughly
+    hits_per_second consecutive lines sharing each timestamp."""
+
+    start = datetime(2016, 3, 1, 12, 0, 0)
+    sections = ['/', '/pages', '/api', '/static', '/images']
+    lines = []
+    for num in range(num_lines):
+        stamp = start + timedelta(seconds=num // hits_per_second)
+        line = '10.0.{0}.{1} - - [{2} -0700] "GET {3}/item HTTP/1.1" 200 {4}'.format(
+            random.randint(0, 255), random.randint(0, 255),
+            stamp.strftime('%d/%b/%Y:%H:%M:%S'), random.choice(sections),
+            random.randint(100, 100000))
+        if log_format == 2:
+            line = 'www.example.com ' + line
+        if log_format in (2, 3):
+            line += ' "http://example.com/" "Mozilla/5.0 (X11; Linux x86_64)"'
+        lines.append(line)
+    return lines
+
+
+def lines_per_second(parse, lines):
+    start = time.time()
+    for line in lines:
+        parse(line)
+    return len(lines) / (time.time() - start)
+
+
+if __name__ == "__main__":
+    usage = "usage: %prog [options]"
+    optparser = OptionParser(usage=usage)
+    optparser.add_option("-n", "--lines", type="int", dest="lines", default=200000,
+                         help="number of lines to parse (defaults to 200000)")
+    optparser.add_option("-f", "--format", type="int", dest="format", default=1,
+                         help="format of generated lines, as an integer 1 (default), 2, or 3 \
+                               (1 - Common, 2 - VirtualHost, 3 - Extended)")
+    optparser.add_option("-r", "--rate", type="int", dest="rate", default=50,
+                         help="lines sharing each timestamp (defaults to 50)")
+    options = optparser.parse_args()[0]
+
+    regex, labels = SimpleHTTPMonitor.logfile_type[options.format - 1]
+    lines = generate_lines(options.lines, options.format, options.rate)
+
+    line_parser = AccessLogParser(regex, labels)
+    for line in lines[:1000]:
+        assert line_parser.parse(line) == legacy_parse(line, regex, labels)
+
+    before = lines_per_second(lambda line: legacy_parse(line, regex, labels), lines)
+    after = lines_per_second(AccessLogParser(regex, labels).parse, lines)
+    print("before: {0:,.0f} lines/sec".format(before))
+    print("after:  {0:,.0f} lines/sec ({1:.1f}x)".format(after, after / before))
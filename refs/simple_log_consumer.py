@@ -6,22 +6,586 @@ consuming an actively written-to w3c-formatted HTTP access log."""
 
 
 import re
+import os
 import operator
 import time
 import pytz
 import sys
 import curses
-import json
+import select
+import struct
+import ctypes
+import ctypes.util
+import marshal
+import threading
 import math
+import mmap
+import multiprocessing
+import heapq
+import calendar
 import logging as log
 from dateutil import parser
 from optparse import OptionParser
 from datetime import datetime, timedelta
 
 
+def date_to_datetime_utc(date):
+    """Converts from a common wc3 access log timestamp string of the format
+    'dd/mmm/yyyy:hh:mm:ss tz', to a timezone aware datetime object set to
+    UTC."""
+
+    # Remove the ':' between dd/mmm/yyyy and hh:mm:ss
+    date = re.sub(r'\:(?=\d+\:\d+\:\d+ )', ' ', date)
+    date = parser.parse(date)
+    return date.astimezone(pytz.utc)
+
+
+def datetime_utc_to_epoch(date):
+    """Converts from a timezone aware datetime object to whole seconds since
+    the epoch."""
+
+    return calendar.timegm(date.utctimetuple())
+
+
+def parse_request_for_section(request):
+    """Parses a common wc3-formatted request string of format
+    'METHOD FILEPATH HTTP/VERSION' and returns the section of the filepath
+    (a section being the content before the second '/' in a URL. i.e. the
+    section for "http://my.site.com/pages/create' is "http://my.site.com/pages")"""
+
+    try:
+        method, section, version = request.split(' ')
+    except Exception as e:
+        log.exception("Request of unexpected format: {}".format(e))
+        return request
+
+    # Assumes that URLs with no second '/' will be categorized as '/'
+    # signifying the base
+    section = section.split('/')
+    if len(section) < 3:
+        return '/'
+
+    return "/{0}".format(section[1])
+
+
+class AccessLogParser:
+    """Fast path parser for the Common, VirtualHost and Extended log formats.
+    The pattern is compiled once, and the fixed 'dd/Mon/yyyy:HH:MM:SS +zzzz'
+    timestamp layout is decoded directly rather than through dateutil. As
+    consecutive lines mostly share the same second, the last timestamp
+    string and its conversions are memoized."""
+
+    MONTHS = {'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+              'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12}
+
+    def __init__(self, regex, labels):
+        self.pattern = re.compile(regex)
+        self.labels = labels
+
+        # For matching lines in place within a MappedLogReader's buffer.
+        # MULTILINE lets '^' match at the start of any line, not only at
+        # the start of the buffer.
+        if not isinstance(regex, bytes):
+            regex = regex.encode('ascii')
+        self.bytes_pattern = re.compile(regex, re.MULTILINE)
+        self.span_groups = dict((label, labels.index(label) + 1) for label in
+                                ['remotehost', 'date_utc', 'request', 'bytes'])
+
+        # Memoized conversion of the most recently seen timestamp
+        self.last_date = None
+        self.last_datetime = None
+        self.last_epoch = None
+
+    def parse(self, line):
+        """Parses an access log line into a dictionary keyed by labels, adding
+        the section of the request and the timestamp in seconds since the
+        epoch. Returns None if the line doesn't match the logfile format."""
+
+        match = self.pattern.match(line)
+        if match is None:
+            return None
+
+        info = dict(zip(self.labels, match.groups()))
+        self.convert_date(info['date_utc'])
+        info['date_utc'] = self.last_datetime
+        info['epoch'] = self.last_epoch
+        info['section'] = parse_request_for_section(info['request'])
+        return info
+
+    def parse_span(self, buf, start, end):
+        """Like parse(), but matches the line at buf[start:end] in place
+        rather than taking a string, and only decodes the fields that the
+        monitor actually uses: remotehost, timestamp, request and bytes."""
+
+        match = self.bytes_pattern.match(buf, start, end)
+        if match is None:
+            return None
+
+        self.convert_date(match.group(self.span_groups['date_utc']))
+        request = self.decode(match.group(self.span_groups['request']))
+        return {'remotehost': self.decode(match.group(self.span_groups['remotehost'])),
+                'request': request,
+                'bytes': self.decode(match.group(self.span_groups['bytes'])),
+                'date_utc': self.last_datetime,
+                'epoch': self.last_epoch,
+                'section': parse_request_for_section(request)}
+
+    def decode(self, field):
+        if isinstance(field, str):
+            return field
+        return field.decode('utf-8', 'replace')
+
+    def convert_date(self, date):
+        """Updates last_datetime and last_epoch for a raw timestamp field,
+        unless it is the same one that was converted last time."""
+
+        if date == self.last_date:
+            return
+        self.last_epoch = self.parse_date(self.decode(date))
+        self.last_datetime = datetime.utcfromtimestamp(
+            self.last_epoch).replace(tzinfo=pytz.utc)
+        self.last_date = date
+
+    def parse_date(self, date):
+        """Converts a 'dd/Mon/yyyy:HH:MM:SS +zzzz' timestamp to seconds since
+        the epoch, falling back to dateutil for anything laid out otherwise."""
+
+        try:
+            if len(date) != 26 or date[2] != '/' or date[11] != ':':
+                raise ValueError(date)
+            offset = (int(date[22:24]) * 60 + int(date[24:26])) * 60
+            if date[21] == '-':
+                offset = -offset
+            elif date[21] != '+':
+                raise ValueError(date)
+            return calendar.timegm((int(date[7:11]), self.MONTHS[date[3:6]],
+                                    int(date[0:2]), int(date[12:14]),
+                                    int(date[15:17]), int(date[18:20]))) - offset
+        except (ValueError, KeyError):
+            return datetime_utc_to_epoch(date_to_datetime_utc(date))
+
+
+class MappedLogReader:
+    """Memory maps a logfile for scanning large stretches of it. Lines are
+    located by searching the mapped bytes for newlines, and handed out as
+    (start, end) offsets into buffer so that AccessLogParser.parse_span() can
+    match them in place, without copying each line into a string first."""
+
+    def __init__(self, logfile):
+        self.file = open(logfile, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.buffer = b''
+        if self.size:
+            self.buffer = mmap.mmap(self.file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+
+    def lines(self, start, end):
+        """Yields the (start, end) offsets of each newline terminated line
+        beginning in [start, end), excluding the newline itself."""
+
+        end = min(end, self.size)
+        pos = start
+        while pos < end:
+            newline = self.buffer.find(b'\n', pos, end)
+            if newline == -1:
+                return
+            yield pos, newline
+            pos = newline + 1
+
+    def close(self):
+        if self.size:
+            self.buffer.close()
+        self.file.close()
+
+
+def scan_log_range(logfile, start, end, line_parser):
+    """Scans the complete lines of logfile lying in the byte range
+    [start, end) through a MappedLogReader. Yields (next_offset, info) for
+    each one, where next_offset is the offset just past the line and info is
+    None if the line was malformed."""
+
+    reader = MappedLogReader(logfile)
+    try:
+        for line_start, line_end in reader.lines(start, end):
+            info = line_parser.parse_span(reader.buffer, line_start, line_end)
+            if info is None:
+                log.error("Malformed logfile line: {0}".format(
+                    reader.buffer[line_start:line_end]))
+            yield line_end + 1, info
+    finally:
+        reader.close()
+
+
+def parse_log_chunk(task):
+    """Process pool worker used while ingesting a large backlog. Parses the
+    lines of the logfile lying in the byte range [start, end), which must
+    begin and end on line boundaries, and returns partial statistics to be
+    merged by SimpleHTTPMonitor.merge_chunk_stats()."""
+
+    logfile, start, end, regex, labels, capacity, window_start = task
+
+    sections = HeavyHitters(capacity)
+    visits = HeavyHitters(capacity)
+    consumers = HeavyHitters(capacity)
+    recent = {}  # epoch second -> hits, only inside the two minute window
+
+    line_parser = AccessLogParser(regex, labels)
+    for next_offset, info in scan_log_range(logfile, start, end, line_parser):
+        if info is None:
+            continue
+
+        if info['epoch'] > window_start:
+            recent[info['epoch']] = recent.get(info['epoch'], 0) + 1
+        sections.add(info['section'])
+        visits.add(info['remotehost'])
+        consumers.add(info['remotehost'], int(info['bytes']))
+
+    return {'bytes': end - start,
+            'recent': recent,
+            'sections': sections.to_dict(),
+            'remotehost_visits': visits.to_dict(),
+            'remotehost_data': consumers.to_dict()}
+
+
+class SlidingWindowCounter:
+    """Counts events over a trailing window of whole seconds using a fixed
+    ring of per-second buckets. Adding an event and reading the window total
+    are both O(1), and memory stays constant regardless of traffic."""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.buckets = [0] * seconds
+        self.head = None  # newest second covered by the ring
+        self.total = 0
+
+    def advance(self, second):
+        """Moves the window forward so that it ends at second, expiring any
+        buckets that fall out of it. Never moves the window backwards."""
+
+        if self.head is None:
+            self.head = second
+            return
+        if second <= self.head:
+            return
+
+        if second - self.head >= self.seconds:
+            self.buckets = [0] * self.seconds
+            self.total = 0
+        else:
+            for sec in range(self.head + 1, second + 1):
+                idx = sec % self.seconds
+                self.total -= self.buckets[idx]
+                self.buckets[idx] = 0
+        self.head = second
+
+    def add(self, second, count=1):
+        """Records count events at the given epoch second. Events older than
+        the current window are ignored."""
+
+        self.advance(second)
+        if second <= self.head - self.seconds:
+            return
+        self.buckets[second % self.seconds] += count
+        self.total += count
+
+    def count(self, second):
+        """Returns the number of events in the window ending at second."""
+
+        self.advance(second)
+        return self.total
+
+    def to_dict(self):
+        return {'seconds': self.seconds,
+                'head': self.head,
+                'buckets': list(self.buckets)}
+
+    @classmethod
+    def from_dict(cls, data):
+        counter = cls(data['seconds'])
+        counter.head = data['head']
+        counter.buckets = list(data['buckets'])
+        counter.total = sum(counter.buckets)
+        return counter
+
+
+class HeavyHitters:
+    """Tracks the heaviest keys of a weighted stream in bounded memory using
+    the Space-Saving algorithm. At most capacity counters are kept in a min
+    heap indexed by key, so an update costs O(log capacity). A reported count
+    overestimates the true count by at most that key's error, which is never
+    more than total / capacity, and every key whose true count exceeds
+    total / capacity is guaranteed to be tracked."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.total = 0
+        self.heap = []   # [count, error, key] entries, smallest count first
+        self.index = {}  # key -> position of its entry in heap
+
+    def add(self, key, weight=1):
+        """Adds weight to the counter for key, evicting the smallest counter
+        if key is not tracked and there is no room left."""
+
+        self.total += weight
+        pos = self.index.get(key)
+        if pos is not None:
+            self.heap[pos][0] += weight
+            self._sift_down(pos)
+        elif len(self.heap) < self.capacity:
+            self.heap.append([weight, 0, key])
+            self.index[key] = len(self.heap) - 1
+            self._sift_up(len(self.heap) - 1)
+        else:
+            # The newcomer inherits the evicted count as its possible error
+            entry = self.heap[0]
+            del self.index[entry[2]]
+            entry[1] = entry[0]
+            entry[0] += weight
+            entry[2] = key
+            self.index[key] = 0
+            self._sift_down(0)
+
+    def top(self, n):
+        """Returns (key, count) pairs for the n largest counters, largest
+        first."""
+
+        entries = heapq.nlargest(n, self.heap, key=operator.itemgetter(0))
+        return [(key, count) for count, error, key in entries]
+
+    def error_bound(self):
+        """Returns the largest amount by which any reported count can exceed
+        the true count."""
+
+        return self.total / float(self.capacity)
+
+    def _swap(self, i, j):
+        self.heap[i], self.heap[j] = self.heap[j], self.heap[i]
+        self.index[self.heap[i][2]] = i
+        self.index[self.heap[j][2]] = j
+
+    def _sift_up(self, pos):
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if self.heap[parent][0] <= self.heap[pos][0]:
+                break
+            self._swap(pos, parent)
+            pos = parent
+
+    def _sift_down(self, pos):
+        size = len(self.heap)
+        while True:
+            smallest = pos
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < size and self.heap[child][0] < self.heap[smallest][0]:
+                    smallest = child
+            if smallest == pos:
+                break
+            self._swap(pos, smallest)
+            pos = smallest
+
+    def to_dict(self):
+        return {'capacity': self.capacity,
+                'total': self.total,
+                'entries': [list(entry) for entry in self.heap]}
+
+    @classmethod
+    def from_dict(cls, data):
+        hitters = cls(data['capacity'])
+        hitters.total = data['total']
+        # A list sorted by count is already a valid min heap
+        hitters.heap = sorted((list(entry) for entry in data['entries']),
+                              key=operator.itemgetter(0))
+        hitters.index = dict((entry[2], pos)
+                             for pos, entry in enumerate(hitters.heap))
+        return hitters
+
+
+class Checkpointer:
+    """Writes snapshots of SimpleHTTPMonitor's state to a compact binary file
+    from a background thread. Snapshots are plain dicts of numbers, strings
+    and lists serialized with marshal, so loading takes milliseconds no
+    matter how much traffic they summarize. Each write goes to a temporary
+    file that is then renamed over the checkpoint, so a crash can never
+    leave a partially written one behind."""
+
+    MAGIC = b'SLC\x01'
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.pending = None
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.write_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def submit(self, snapshot):
+        """Queues a snapshot to be written, replacing any that the background
+        thread hasn't got to yet."""
+
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+
+    def close(self):
+        """Writes any queued snapshot and stops the background thread."""
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def write_loop(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                snapshot, self.pending = self.pending, None
+
+            # Only closing wakes us without a snapshot
+            if snapshot is None:
+                return
+            try:
+                self.write(snapshot)
+            except Exception as e:
+                log.exception("Failed to write checkpoint: {0}".format(e))
+
+    def write(self, snapshot):
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            f.write(self.MAGIC)
+            f.write(marshal.dumps(snapshot, 2))
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmp_filename, self.filename)
+
+    def load(self):
+        """Returns the last snapshot written, or None if there is no valid
+        checkpoint."""
+
+        try:
+            with open(self.filename, 'rb') as f:
+                data = f.read()
+        except IOError:
+            return None
+
+        if data[:len(self.MAGIC)] != self.MAGIC:
+            log.error("Ignoring invalid checkpoint {0}".format(self.filename))
+            return None
+        try:
+            return marshal.loads(data[len(self.MAGIC):])
+        except (ValueError, EOFError, TypeError) as e:
+            log.exception("Ignoring invalid checkpoint {0}: {1}".format(
+                self.filename, e))
+            return None
+
+
+class PollingWatcher:
+    """Notices changes to the logfile by comparing its inode, size and
+    modification time every interval seconds. Used wherever inotify isn't
+    available."""
+
+    def __init__(self, logfile, interval=1.0):
+        self.logfile = logfile
+        self.interval = interval
+        self.last_stat = self.stat()
+
+    def stat(self):
+        try:
+            st = os.stat(self.logfile)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime)
+
+    def fileno(self):
+        """Polling has nothing to select() on."""
+
+        return None
+
+    def changed(self):
+        """Returns True if the logfile looks different since the last call."""
+
+        current = self.stat()
+        if current == self.last_stat:
+            return False
+        self.last_stat = current
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """Notices changes to the logfile through Linux inotify. The directory
+    holding the logfile is watched rather than the file itself, so writes,
+    truncation and logrotate moving or recreating the file are all reported
+    without having to re-add watches. The descriptor can be select()ed on,
+    so waiting for traffic costs no CPU at all."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_CLOEXEC = 0o2000000
+
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, logfile):
+        self.name = os.path.basename(logfile)
+        if not isinstance(self.name, bytes):
+            self.name = self.name.encode('utf-8')
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        directory = os.path.dirname(os.path.abspath(logfile))
+        if not isinstance(directory, bytes):
+            directory = directory.encode('utf-8')
+        mask = (self.IN_MODIFY | self.IN_CLOSE_WRITE | self.IN_MOVED_FROM |
+                self.IN_MOVED_TO | self.IN_CREATE | self.IN_DELETE)
+        if self.libc.inotify_add_watch(self.fd, directory, mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, "inotify_add_watch failed")
+
+    def fileno(self):
+        return self.fd
+
+    def changed(self):
+        """Drains all pending events, returning True if any of them concern
+        the logfile."""
+
+        changed = False
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError:
+                # EAGAIN, nothing left to read
+                return changed
+            if not data:
+                return changed
+
+            pos = 0
+            while pos < len(data):
+                wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(data, pos)
+                pos += self.EVENT_HEADER.size
+                name = data[pos:pos + length].rstrip(b'\0')
+                pos += length
+                if name == self.name or mask & self.IN_Q_OVERFLOW:
+                    changed = True
+
+    def close(self):
+        os.close(self.fd)
+
+
 class SimpleHTTPMonitor:
     # REGEX Patterns
-    common = r'(\S+) (\S+) (\S+) \[(.*)\] \"(.*)\" (\d+) (\d+)'
+    common = r'(\S+) (\S+) (\S+) \[([^\]]*)\] \"((?:[^\"\\]|\\.)*)\" (\d+) (\d+)'
     vhosts = r'(^\S+) {} \"(\S+)\" \"(.*)\"'.format(common)
     extended = r'^{} \"(\S+)\" \"(.*)\"'.format(common)
 
@@ -34,6 +598,24 @@ class SimpleHTTPMonitor:
     logfile_type = [(common, common_labels), (vhosts, vhosts_labels),
                     (extended, extended_labels)]
 
+    # Statistics kept as HeavyHitters
+    heavy_hitter_keys = ['sections', 'remotehost_visits', 'remotehost_data']
+
+    # Backlogs at least this large are parsed in parallel, in chunks
+    CHUNK_BYTES = 16 * 1024 * 1024
+    PARALLEL_MIN_BYTES = 4 * CHUNK_BYTES
+
+    # Smaller backlogs worth reading through a memory mapping
+    MAPPED_MIN_BYTES = 1024 * 1024
+
+    # Seconds between redraws of the initial progress bar
+    PROGRESS_INTERVAL = 0.1
+
+    # Seconds between status updates when the logfile isn't changing, and
+    # to wait after a change so that bursts of writes are read together
+    REFRESH_INTERVAL = 10
+    COALESCE_INTERVAL = 0.025
+
     # Others constants
     TWOMINS = timedelta(minutes=2)
     DOWN = 1
@@ -62,25 +644,57 @@ class SimpleHTTPMonitor:
 
         # Configs
         self.alert_threshold = self.options.threshold
+        if self.options.error:
+            self.capacity = int(math.ceil(1.0 / self.options.error))
+        else:
+            self.capacity = self.options.capacity
         self.regex, self.log_labels = self.logfile_type[
             self.options.format - 1]
+        self.line_parser = AccessLogParser(self.regex, self.log_labels)
+
+        self.jobs = self.options.jobs
 
         # Flags
         self.init_flag = True
+        self.last_progress = 0
         self.two_min_traffic_flag = False
+        # When the flag last changed, so a restored alert keeps its time
+        self.two_min_traffic_flag_utc = None
+
+        # Logfile Tailing
+        self.logfh = None
+
+        # Logfile Change Notification
+        self.watcher = None
+        if not self.options.poll_flag:
+            try:
+                self.watcher = InotifyWatcher(self.logfile)
+            except (OSError, AttributeError) as e:
+                log.error("inotify unavailable, polling instead: {0}".format(e))
+        if self.watcher is None:
+            self.watcher = PollingWatcher(self.logfile)
+
+        # Checkpointing
+        self.checkpointer = None
+        self.last_checkpoint = time.time()
+        if self.options.cache_flag:
+            self.checkpointer = Checkpointer('slc_cache_{}.ckpt'.format(
+                os.path.basename(self.logfile)))
 
         # Statistics
-        self.stats = {'master_index': 0,
+        self.stats = {'offset': 0,
+                      'inode': None,
                       'updated_utc': 0,
                       'average_hits_hour': 0,
                       'peak_hits_hour': 0,
-                      'sections': {},
+                      'sections': HeavyHitters(self.capacity),
                       'top_5_sections': {},
-                      'remotehost_visits': {},
-                      'remotehost_data': {},
+                      'remotehost_visits': HeavyHitters(self.capacity),
+                      'remotehost_data': HeavyHitters(self.capacity),
                       'top_5_remotehost_visits': {},
                       'top_5_remotehost_consumers': {},
-                      '2_min_traffic': [],
+                      '2_min_traffic': SlidingWindowCounter(
+                          self.TWOMINS.seconds),
                       'alert_messages': []}
 
         self.run()
@@ -90,15 +704,18 @@ class SimpleHTTPMonitor:
 
         while 1:
             if self.cache_flag:
-                # Check for cached json file
-                cached_stats = self.check_for_cache()
-                if cached_stats != -1:
-                    self.stats = cached_stats.copy()
+                # Resume from the last checkpoint, if there is one
+                self.restore_checkpoint()
                 self.cache_flag = False
 
             self.renew_stats()
             self.refresh_screen()
 
+            if self.checkpointer is not None and \
+                    time.time() - self.last_checkpoint >= self.options.checkpoint_interval:
+                self.checkpointer.submit(self.snapshot_stats())
+                self.last_checkpoint = time.time()
+
             # Init only runs once
             if self.init_flag:
                 self.init_flag = False
@@ -107,23 +724,62 @@ class SimpleHTTPMonitor:
                 if len(self.stats['alert_messages']) > self.alrtscr_height:
                     self.topLineNum = len(self.stats['alert_messages']) - (self.alrtscr_height - 1)
 
-            # Wait for 10 seconds, but allow user input
-            start = time.time()
-            while (time.time() - start) < 10:
-                # Grab User Inputs
-                c = self.stdscr.getch()
-                if c == curses.KEY_UP:
-                    self.pagination(self.UP)
-                elif c == curses.KEY_DOWN:
-                    self.pagination(self.DOWN)
-                elif c == self.KEY_B:
-                    self.pagination(self.PAGE_UP)
-                elif c == self.KEY_V:
-                    self.pagination(self.PAGE_DOWN)
-                elif c == self.ESC_KEY:
-                    sys.exit()
-
-                self.renew_alerts()
+            self.wait_for_activity()
+
+    def wait_for_activity(self):
+        """Sleeps until the logfile changes or REFRESH_INTERVAL passes, while
+        handling user input as it arrives. Nothing is done while idle, except
+        for a check once a second while there is traffic in the two minute
+        window, so alerts can recover as it drains."""
+
+        deadline = time.time() + self.REFRESH_INTERVAL
+        while True:
+            now = time.time()
+            if now >= deadline:
+                return
+
+            timeout = deadline - now
+            if self.two_min_traffic() or self.watcher.fileno() is None:
+                timeout = min(timeout, 1.0)
+
+            fds = [sys.stdin]
+            if self.watcher.fileno() is not None:
+                fds.append(self.watcher.fileno())
+            try:
+                readable = select.select(fds, [], [], timeout)[0]
+            except select.error:
+                # Interrupted, e.g. by a terminal resize
+                readable = [sys.stdin]
+
+            if sys.stdin in readable:
+                self.handle_input()
+
+            if self.watcher.fileno() is None or self.watcher.fileno() in readable:
+                if self.watcher.changed():
+                    # Let a burst of writes finish before reading it
+                    time.sleep(self.COALESCE_INTERVAL)
+                    self.watcher.changed()
+                    return
+
+            self.renew_alerts()
+
+    def handle_input(self):
+        """Handles every key press waiting in the input buffer."""
+
+        while True:
+            c = self.stdscr.getch()
+            if c == -1:
+                return
+            elif c == curses.KEY_UP:
+                self.pagination(self.UP)
+            elif c == curses.KEY_DOWN:
+                self.pagination(self.DOWN)
+            elif c == self.KEY_B:
+                self.pagination(self.PAGE_UP)
+            elif c == self.KEY_V:
+                self.pagination(self.PAGE_DOWN)
+            elif c == self.ESC_KEY:
+                sys.exit()
 
     def init_progress(self, num, length):
         """Prints minimal labels and a progress bar when SimpleHTTPMonitor is
@@ -148,23 +804,53 @@ class SimpleHTTPMonitor:
 
         self.stdscr.refresh()
 
-    def check_for_cache(self):
-        """Checks if there is an existing cache file to read from. Returns -1
-        upon error."""
-
-        cache_filename = 'slc_cache_{}.json'.format(
-            self.logfile.split('/')[-1])
-        stats = {}
-        try:
-            with open(cache_filename, 'r') as f:
-                stats = json.loads(f.read())
-                for idx, tmstmp in enumerate(stats['2_min_traffic']):
-                    stats['2_min_traffic'][idx] = self.date_to_datetime_utc(tmstmp)
-                stats['updated_utc'] = self.date_to_datetime_utc(stats['updated_utc'])
-        except Exception as e:
-            log.exception("{0}".format(e))
-            stats = -1
-        return stats
+    def snapshot_stats(self):
+        """Returns a copy of the statistics made only of plain values, for
+        Checkpointer to write out. The top 5 lists aren't included, as they
+        are recomputed from the heavy hitters."""
+
+        snapshot = {'offset': self.stats['offset'],
+                    'inode': self.stats['inode'],
+                    'updated_epoch': datetime_utc_to_epoch(self.stats['updated_utc']),
+                    'average_hits_hour': self.stats['average_hits_hour'],
+                    'peak_hits_hour': self.stats['peak_hits_hour'],
+                    '2_min_traffic': self.stats['2_min_traffic'].to_dict(),
+                    'alert_messages': list(self.stats['alert_messages']),
+                    # Without the alert state, a restart would raise an alert
+                    # that's already up again, or never report its recovery
+                    'two_min_traffic_flag': self.two_min_traffic_flag,
+                    'two_min_traffic_flag_epoch': None if self.two_min_traffic_flag_utc is None \
+                        else datetime_utc_to_epoch(self.two_min_traffic_flag_utc)}
+        for key in self.heavy_hitter_keys:
+            snapshot[key] = self.stats[key].to_dict()
+        return snapshot
+
+    def restore_checkpoint(self):
+        """Replaces the statistics with those from the last checkpoint, if
+        there is one. The stored offset and inode let read_new_lines() resume
+        where the checkpoint left off, or start over if the logfile has been
+        rotated or truncated since."""
+
+        snapshot = self.checkpointer.load()
+        if snapshot is None:
+            return
+
+        self.stats['offset'] = snapshot['offset']
+        self.stats['inode'] = snapshot['inode']
+        self.stats['updated_utc'] = datetime.utcfromtimestamp(
+            snapshot['updated_epoch']).replace(tzinfo=pytz.utc)
+        self.stats['average_hits_hour'] = snapshot['average_hits_hour']
+        self.stats['peak_hits_hour'] = snapshot['peak_hits_hour']
+        self.stats['2_min_traffic'] = SlidingWindowCounter.from_dict(
+            snapshot['2_min_traffic'])
+        self.stats['alert_messages'] = snapshot['alert_messages']
+        # Checkpoints written before the alert state was kept have none
+        self.two_min_traffic_flag = snapshot.get('two_min_traffic_flag', False)
+        flag_epoch = snapshot.get('two_min_traffic_flag_epoch')
+        self.two_min_traffic_flag_utc = None if flag_epoch is None else \
+            datetime.utcfromtimestamp(flag_epoch).replace(tzinfo=pytz.utc)
+        for key in self.heavy_hitter_keys:
+            self.stats[key] = HeavyHitters.from_dict(snapshot[key])
 
     def refresh_screen(self):
         """Refreshs the main SimpleHTTPMonitor screen, updating various data
@@ -200,7 +886,7 @@ class SimpleHTTPMonitor:
 
         # Print Summary Statistics
         self.stdscr.addstr(9, 2, "Traffic (hits past 2 minutes): {0}".format(
-            len(self.stats['2_min_traffic'])))
+            self.two_min_traffic()))
         self.stdscr.addstr(
             10, 2, "Threshold (hits): {0}".format(self.alert_threshold))
         self.stdscr.addstr(
@@ -243,111 +929,50 @@ class SimpleHTTPMonitor:
         self.PAGE_UP = -1 * (self.alrtscr_height / 2)
 
         # Make sure that if traffic is high, that another alert is printed
-        if len(self.stats['2_min_traffic']) >= self.alert_threshold:
+        if self.two_min_traffic() >= self.alert_threshold:
             self.two_min_traffic_flag = False
         self.renew_alerts()
 
         self.stdscr.refresh()
 
-    def date_to_datetime_utc(self, date):
-        """Converts from a common wc3 access log timestamp string of the format
-        'dd/mmm/yyyy:hh:mm:ss tz', to a timezone aware datetime object set to
-        UTC."""
-
-        # Remove the ':' between dd/mmm/yyyy and hh:mm:ss
-        date = re.sub(r'\:(?=\d+\:\d+\:\d+ )', ' ', date)
-        date = parser.parse(date)
-        return date.astimezone(pytz.utc)
-
-    def datetime_utc_to_string(self, date):
-        """Converts from a timezone aware datetime object set to UTC, to a common 
-        wc3 access log timestamp string of the format 'dd/mmm/yyyy:hh:mm:ss tz'"""
-
-        return date.strftime("%m/%d/%Y:%H:%M:%S %z")
-
-    def parse_request_for_section(self, request):
-        """Parses a common wc3-formatted request string of format 
-        'METHOD FILEPATH HTTP/VERSION' and returns the section of the filepath 
-        (a section being the content before the second '/' in a URL. i.e. the 
-        section for "http://my.site.com/pages/create' is "http://my.site.com/pages")"""
-
-        try:
-            method, section, version = request.split(' ')
-        except Exception as e:
-            log.exception("Request of unexpected format: {}".format(e))
-            return request
-
-        # Assumes that URLs with no second '/' will be categorized as '/'
-        # signifying the base
-        section = section.split('/')
-        if len(section) < 3:
-            return '/'
-
-        return "/{0}".format(section[1])
-
     def count_section(self, section):
-        """Increments a section counter in a dictionary called sections which
-        is stored in the dictionary stats, to keep track of the number of
-        requests to each section."""
+        """Increments the counter for a section in stats['sections'], to keep
+        track of the number of requests to each section."""
 
-        if section not in self.stats['sections'].keys():
-            self.stats['sections'][section] = 1
-        else:
-            self.stats['sections'][section] += 1
+        self.stats['sections'].add(section)
 
     def top_5_sections(self):
-        """Determines the top 5 most requested sections by iterating over the
-        stats['sections'] dictionary."""
+        """Determines the top 5 most requested sections from the
+        stats['sections'] heavy hitters."""
 
-        self.stats['top_5_sections'] = []
-        sorted_sections = sorted(
-            self.stats['sections'].items(), key=operator.itemgetter(1))
-        for section, num_hits in reversed(sorted_sections[-5:]):
-            self.stats['top_5_sections'].append((section, num_hits))
+        self.stats['top_5_sections'] = self.stats['sections'].top(5)
 
     def count_remotehost_visit(self, remotehost):
-        """Increments a remotehost counter in a dictionary called remotehost_visits
-        which is stored in the dictionary stats, to keep track of the number of
-        visits from each remotehost."""
+        """Increments the counter for a remotehost in stats['remotehost_visits'],
+        to keep track of the number of visits from each remotehost."""
 
-        if remotehost not in self.stats['remotehost_visits'].keys():
-            self.stats['remotehost_visits'][remotehost] = 1
-        else:
-            self.stats['remotehost_visits'][remotehost] += 1
+        self.stats['remotehost_visits'].add(remotehost)
 
     def top_5_remotehost_visitors(self):
-        """Determines the top 5 remotehost visitors by iterating over the
-        stats['remotehost_visits'] dictionary."""
+        """Determines the top 5 remotehost visitors from the
+        stats['remotehost_visits'] heavy hitters."""
 
-        self.stats['top_5_remotehost_visits'] = []
-        sorted_remotehost_visits = sorted(
-            self.stats['remotehost_visits'].items(), key=operator.itemgetter(1))
-        for remotehost, num_hits in reversed(sorted_remotehost_visits[-5:]):
-            self.stats['top_5_remotehost_visits'].append(
-                (remotehost, num_hits))
+        self.stats['top_5_remotehost_visits'] = \
+            self.stats['remotehost_visits'].top(5)
 
     def count_remotehost_data(self, info):
-        """Increments a remotehost counter in a dictionary called remotehost_data
-        which is stored in the dictionary stats, to keep track of the amount of
-        data consumption by each remotehost."""
-
-        remotehost = info['remotehost']
-        bytes = info['bytes']
-        if remotehost not in self.stats['remotehost_data'].keys():
-            self.stats['remotehost_data'][remotehost] = int(bytes)
-        else:
-            self.stats['remotehost_data'][remotehost] += int(bytes)
+        """Adds the bytes of a request to the counter for its remotehost in
+        stats['remotehost_data'], to keep track of the amount of data
+        consumption by each remotehost."""
+
+        self.stats['remotehost_data'].add(info['remotehost'], int(info['bytes']))
 
     def top_5_remotehost_consumers(self):
-        """Determines the top 5 remotehost data consumers by iterating over the
-        stats['remotehost_data'] dictionary."""
+        """Determines the top 5 remotehost data consumers from the
+        stats['remotehost_data'] heavy hitters."""
 
-        self.stats['top_5_remotehost_consumers'] = []
-        sorted_remotehost_data = sorted(
-            self.stats['remotehost_data'].items(), key=operator.itemgetter(1))
-        for remotehost, bytes in reversed(sorted_remotehost_data[-5:]):
-            self.stats['top_5_remotehost_consumers'].append(
-                (remotehost, bytes))
+        self.stats['top_5_remotehost_consumers'] = \
+            self.stats['remotehost_data'].top(5)
 
         # Make bytes into human-readable denominations
         # Could be rewritten to use KiB rather than KB
@@ -371,69 +996,204 @@ class SimpleHTTPMonitor:
             self.stats['top_5_remotehost_consumers'][
                 index] = (remotehost, data)
 
+    def read_new_lines(self):
+        """Returns the complete lines appended to the logfile since the last
+        call. Reading resumes from the byte offset stored in stats, so the cost
+        is proportional to new traffic rather than to the size of the file.
+        Rotation (the path now refers to a different inode) and truncation
+        (the file shrank below our offset) are detected, and whatever remains
+        in a rotated file is drained before switching over to the new one."""
+
+        try:
+            st = os.stat(self.logfile)
+        except OSError:
+            st = None
+
+        lines = []
+        if self.logfh is None:
+            if st is None:
+                sys.exit("Could not open logfile {}".format(self.logfile))
+            self.logfh = open(self.logfile, 'rb')
+            # Only trust a stored offset if it still refers to the same file
+            if st.st_ino != self.stats['inode'] or st.st_size < self.stats['offset']:
+                self.stats['offset'] = 0
+            self.stats['inode'] = st.st_ino
+        else:
+            lines.extend(self.read_complete_lines())
+            if st is None:
+                # Rotated away and not yet recreated, try again next time
+                return lines
+            if st.st_ino != self.stats['inode']:
+                log.info("Logfile {0} was rotated".format(self.logfile))
+                self.logfh.close()
+                self.logfh = open(self.logfile, 'rb')
+                self.stats['inode'] = st.st_ino
+                self.stats['offset'] = 0
+            elif st.st_size < self.stats['offset']:
+                log.info("Logfile {0} was truncated".format(self.logfile))
+                self.stats['offset'] = 0
+
+        unread = st.st_size - self.stats['offset']
+        if self.jobs > 1 and unread >= self.PARALLEL_MIN_BYTES:
+            self.ingest_backlog(st.st_size)
+        elif unread >= self.MAPPED_MIN_BYTES:
+            self.ingest_mapped(st.st_size)
+
+        lines.extend(self.read_complete_lines())
+        return lines
+
+    def chunk_boundaries(self, start, end):
+        """Splits the byte range [start, end) of the logfile into pieces of
+        roughly CHUNK_BYTES, each beginning just after a newline. The last
+        boundary is the end of the last complete line, so a partially written
+        line is left for the next read."""
+
+        boundaries = [start]
+        with open(self.logfile, 'rb') as f:
+            pos = start + self.CHUNK_BYTES
+            while pos < end:
+                f.seek(pos)
+                f.readline()
+                pos = f.tell()
+                if pos >= end:
+                    break
+                boundaries.append(pos)
+                pos += self.CHUNK_BYTES
+
+            # Step back from the end to find the last complete line
+            tail = end
+            while tail > boundaries[-1]:
+                block = min(65536, tail - boundaries[-1])
+                f.seek(tail - block)
+                newline = f.read(block).rfind(b'\n')
+                if newline != -1:
+                    boundaries.append(tail - block + newline + 1)
+                    break
+                tail -= block
+
+        return boundaries
+
+    def ingest_backlog(self, end):
+        """Parses the unread part of the logfile up to end in a process pool,
+        one newline-aligned chunk per task, merging each chunk's statistics as
+        it completes and advancing the stored offset past everything read."""
+
+        start = self.stats['offset']
+        boundaries = self.chunk_boundaries(start, end)
+        if len(boundaries) < 2:
+            return
+
+        window_start = int(time.time()) - self.TWOMINS.seconds
+        tasks = [(self.logfile, boundaries[i], boundaries[i + 1], self.regex,
+                  self.log_labels, self.capacity, window_start)
+                 for i in range(len(boundaries) - 1)]
+
+        done = 0
+        total = boundaries[-1] - start
+        pool = multiprocessing.Pool(self.jobs)
+        try:
+            for chunk_stats in pool.imap_unordered(parse_log_chunk, tasks):
+                self.merge_chunk_stats(chunk_stats)
+                done += chunk_stats['bytes']
+                if self.init_flag:
+                    self.init_progress(done, total)
+        finally:
+            pool.close()
+            pool.join()
+
+        self.stats['offset'] = boundaries[-1]
+
+    def ingest_mapped(self, end):
+        """Parses the unread part of the logfile up to end by scanning a
+        memory mapping of it, counting each line straight into stats and
+        advancing the stored offset past the last complete line."""
+
+        start = self.stats['offset']
+        for next_offset, info in scan_log_range(self.logfile, start, end,
+                                                self.line_parser):
+            self.stats['offset'] = next_offset
+            if self.init_flag and \
+                    time.time() - self.last_progress >= self.PROGRESS_INTERVAL:
+                self.init_progress(next_offset - start, end - start)
+                self.last_progress = time.time()
+            if info is None:
+                continue
+
+            self.stats['2_min_traffic'].add(info['epoch'])
+            self.count_section(info['section'])
+            self.count_remotehost_visit(info['remotehost'])
+            self.count_remotehost_data(info)
+
+    def merge_chunk_stats(self, chunk_stats):
+        """Folds the partial statistics returned by parse_log_chunk() into
+        stats."""
+
+        for second, hits in chunk_stats['recent'].items():
+            self.stats['2_min_traffic'].add(second, hits)
+        for key in self.heavy_hitter_keys:
+            for count, error, name in chunk_stats[key]['entries']:
+                self.stats[key].add(name, count)
+
+    def read_complete_lines(self):
+        """Reads from the stored offset of the open logfile to its end, and
+        returns the newline terminated lines found there. A trailing partial
+        line is left unconsumed until the rest of it has been written."""
+
+        self.logfh.seek(self.stats['offset'])
+        chunk = self.logfh.read()
+        end = chunk.rfind(b'\n')
+        if end == -1:
+            return []
+
+        chunk = chunk[:end + 1]
+        self.stats['offset'] += len(chunk)
+        if not isinstance(chunk, str):
+            chunk = chunk.decode('utf-8', 'replace')
+        return chunk.splitlines()
+
     def renew_stats(self):
         """Parses data from unread lines in the provided logfile. Data is then
         organized into corresponding keys in the stats dictionary for use by
         other functions."""
 
-        # Only read in unread lines
-        data = []
-        try:
-            with open(self.logfile, 'r') as f:
-                for i, line in enumerate(f):
-                    if i >= self.stats['master_index']:
-                        data.append(line)
-        except:
-            self.optparser.error(
-                "Could not open logfile {}".format(self.logfile))
-
         # Constants
         self.stats['updated_utc'] = datetime.now(pytz.utc)
         now = self.stats['updated_utc']  # redundant, but helps be explicit
 
+        # Lines from before the current two minute window are ignored cheaply
+        self.stats['2_min_traffic'].advance(datetime_utc_to_epoch(now))
+
+        # Only read in unread lines
+        data = self.read_new_lines()
+
         if data:
             if not data[-1]:
                 data.pop(-1)
 
             for num, line in enumerate(data):
-                if self.init_flag:
+                if self.init_flag and \
+                        time.time() - self.last_progress >= self.PROGRESS_INTERVAL:
                     self.init_progress(num, len(data))
+                    self.last_progress = time.time()
 
-                line = re.search(self.regex, line)
-                info = {}
-                for idx, label in enumerate(self.log_labels):
-                    if label == 'date_utc':
-                        info[label] = self.date_to_datetime_utc(
-                            line.group(idx + 1))
-                        if (now - info[label]) <= self.TWOMINS:
-                            self.stats['2_min_traffic'].append(info[label])
-                    elif label == 'request':
-                        info[label] = line.group(idx + 1)
-                        info['section'] = self.parse_request_for_section(
-                            line.group(idx + 1))
-                    else:
-                        try:
-                            info[label] = line.group(idx + 1)
-                        except AttributeError as e:
-                            log.error(
-                                "Malformed logfile line: {0}\n\t{1}".format(
-                                    e, line.group(0)))
-                            continue
+                info = self.line_parser.parse(line)
+                if info is None:
+                    log.error("Malformed logfile line: {0}".format(line))
+                    continue
 
+                self.stats['2_min_traffic'].add(info['epoch'])
                 self.count_section(info['section'])
                 self.count_remotehost_visit(info['remotehost'])
                 self.count_remotehost_data(info)
 
-                self.stats['master_index'] += 1
+        self.top_5_sections()
+        self.top_5_remotehost_visitors()
+        self.top_5_remotehost_consumers()
 
-            self.top_5_sections()
-            self.top_5_remotehost_visitors()
-            self.top_5_remotehost_consumers()
+    def two_min_traffic(self):
+        """Returns the number of hits recorded over the past two minutes."""
 
-        # Finally check any remaining 2_min_traffic items to see current load
-        for idx, hit_utc_tstmp in enumerate(self.stats['2_min_traffic']):
-            if (now - hit_utc_tstmp) > self.TWOMINS:
-                self.stats['2_min_traffic'].pop(idx)
+        return self.stats['2_min_traffic'].count(int(time.time()))
 
     def renew_alerts(self):
         """Refreshs the alert messages screen section by first calling
@@ -456,27 +1216,30 @@ class SimpleHTTPMonitor:
         an alert message is appended to the stats['alert_messages'] list to be
         displayed by the renew_alerts() function."""
 
-        if len(self.stats['2_min_traffic']) >= self.alert_threshold and \
+        two_min_traffic = self.two_min_traffic()
+        if two_min_traffic >= self.alert_threshold and \
                 self.two_min_traffic_flag is False:
             self.stats['alert_messages'].append(
                 "{0}: High traffic generated an alert - hits = {1}, triggered at {2}".format(
                     len(self.stats['alert_messages']) + 1,
-                    len(self.stats['2_min_traffic']),
+                    two_min_traffic,
                     self.stats['updated_utc'].strftime("%m/%d/%Y %H:%M:%S UTC")))
             self.two_min_traffic_flag = True
+            self.two_min_traffic_flag_utc = self.stats['updated_utc']
 
             # Check alert pad height to readjust view
             if len(self.stats['alert_messages']) > self.alrtscr_height:
                 self.topLineNum = len(self.stats['alert_messages']) - (self.alrtscr_height - 1)
 
-        elif len(self.stats['2_min_traffic']) < self.alert_threshold and \
+        elif two_min_traffic < self.alert_threshold and \
                 self.two_min_traffic_flag is True:
             self.stats['alert_messages'].append(
                 "{0}: Recovered from high traffic - hits = {1}, recovered at {2}".format(
                     len(self.stats['alert_messages']) + 1,
-                    len(self.stats['2_min_traffic']),
+                    two_min_traffic,
                     self.stats['updated_utc'].strftime("%m/%d/%Y %H:%M:%S UTC")))
             self.two_min_traffic_flag = False
+            self.two_min_traffic_flag_utc = self.stats['updated_utc']
 
             # Check alert pad height to readjust view
             if len(self.stats['alert_messages']) > self.alrtscr_height:
@@ -512,22 +1275,24 @@ class SimpleHTTPMonitor:
 
     def __del__(self):
         """Cleans up loose ends whenever the program exits by first returning
-        the console to its' original state, and then by attempting to cache
-        any collected data, if the options.cache_flag is set."""
+        the console to its' original state, and then by writing a final
+        checkpoint of any collected data, if the options.cache_flag is set."""
 
         try:
             curses.echo()
             curses.nocbreak()
             curses.endwin()
 
-            if self.options.cache_flag:
-                for idx, tmstmp in enumerate(self.stats['2_min_traffic']):
-                    self.stats['2_min_traffic'][idx] = self.datetime_utc_to_string(tmstmp)
-                self.stats['updated_utc'] = self.datetime_utc_to_string(self.stats['updated_utc'])
-                cache_filename = 'slc_cache_{}.json'.format(
-                    self.logfile.split('/')[-1])
-                with open(cache_filename, 'wb') as f:
-                    f.write(json.dumps(self.stats))
+            if self.logfh is not None:
+                self.logfh.close()
+            if self.watcher is not None:
+                self.watcher.close()
+
+            if self.checkpointer is not None:
+                # Nothing worth keeping was collected before the first update
+                if not self.init_flag:
+                    self.checkpointer.submit(self.snapshot_stats())
+                self.checkpointer.close()
         except Exception as e:
             log.exception("Failed in __del__: {0}".format(e))
 
@@ -541,6 +1306,18 @@ if __name__ == "__main__":
     optparser.add_option("-t", "--threshold", type="int", dest="threshold", 
                          default=100,
                          help="traffic threshold for warnings (defaults to 100)")
+    optparser.add_option("-k", "--capacity", type="int", dest="capacity",
+                         default=1000,
+                         help="number of sections and remotehosts to keep counters \
+                               for (defaults to 1000)")
+    optparser.add_option("-e", "--error", type="float", dest="error",
+                         default=None,
+                         help="largest error allowed in top 5 counts, as a fraction \
+                               of all hits (overrides --capacity)")
+    optparser.add_option("-j", "--jobs", type="int", dest="jobs",
+                         default=multiprocessing.cpu_count(),
+                         help="number of processes used to parse a large backlog \
+                               (defaults to the number of CPUs)")
     optparser.add_option("-l", "--logging", type="string", dest="logging_filename", 
                          default='simple_log_consumer.log',
                          help="logging file that simple_log_consumer.py prints logs to \
@@ -548,6 +1325,13 @@ if __name__ == "__main__":
     optparser.add_option("-c", "--cache", action="store_true", 
                          dest="cache_flag", default=False,
                          help="turn caching off (defaults to on)")
+    optparser.add_option("-p", "--poll", action="store_true",
+                         dest="poll_flag", default=False,
+                         help="poll the logfile for changes instead of using inotify")
+    optparser.add_option("-i", "--checkpoint-interval", type="int",
+                         dest="checkpoint_interval", default=30,
+                         help="seconds between checkpoints while caching \
+                               (defaults to 30)")
     options = optparser.parse_args()[0]
 
     try:
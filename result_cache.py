@@ -0,0 +1,186 @@
+"""result_cache.py
+
+A cache of query results, so that re-running a SELECT or re-opening a table
+doesn't go back to the server. Only statements that read tables, without
+calling functions that could have side effects or change from call to
+call, are cached. Memory is bounded by an estimate of the size
+of the cached rows, least recently used results are evicted first, and every
+result expires after a while in case the data was changed by someone else."""
+
+
+import re
+import sys
+import time
+import threading
+from collections import OrderedDict
+
+
+# Statements that may be cached. Anything else is treated as a write.
+READ_ONLY_RE = re.compile(r'^\s*\(?\s*(select|show|describe|desc|explain)\b', re.IGNORECASE)
+WRITE_RE = re.compile(r'\b(insert|update|delete|merge|replace|create|drop|alter|truncate|'
+                      r'rename|grant|revoke|into|analyze|vacuum|lock|call)\b', re.IGNORECASE)
+
+# Names followed by an opening parenthesis: function calls, and keywords
+CALL_RE = re.compile(r'([\w$]+)\s*\(')
+# Keywords that can come before a parenthesis, and functions whose results
+# depend only on their arguments and the tables read
+PURE_CALLS = frozenset([
+    'select', 'from', 'join', 'where', 'on', 'using', 'in', 'exists', 'any', 'all',
+    'some', 'values', 'as', 'and', 'or', 'not', 'over', 'filter', 'within', 'partition',
+    'union', 'intersect', 'except', 'having', 'by', 'when', 'then', 'else', 'with',
+    'count', 'sum', 'min', 'max', 'avg', 'coalesce', 'nullif', 'cast', 'lower', 'upper',
+    'length', 'char_length', 'octet_length', 'substr', 'substring', 'trim', 'round',
+    'abs', 'floor', 'ceil', 'concat', 'group_concat', 'string_agg', 'array_agg',
+    'distinct', 'row_number', 'rank', 'dense_rank', 'greatest', 'least', 'extract',
+    'date_trunc', 'to_char', 'replace', 'left', 'right', 'if', 'ifnull', 'case'])
+# Values that change from one moment to the next, without parentheses
+VOLATILE_RE = re.compile(r'\b(current_date|current_time|current_timestamp|localtime|'
+                         r'localtimestamp)\b', re.IGNORECASE)
+
+# Keywords whose case normalization ignores. Other words may be names of
+# tables, which are case sensitive in MySQL on Linux, so are left as written.
+KEYWORDS = PURE_CALLS | frozenset([
+    'asc', 'desc', 'between', 'like', 'ilike', 'is', 'null', 'true', 'false',
+    'group', 'order', 'limit', 'offset', 'inner', 'outer', 'cross', 'natural',
+    'full', 'end', 'show', 'describe', 'explain', 'tables', 'columns', 'index',
+    'fetch', 'first', 'next', 'rows', 'only', 'row', 'recursive', 'lateral',
+    'escape', 'collate', 'interval', 'unknown'])
+WORD_RE = re.compile(r'[\w$]+')
+
+# String literals and quoted identifiers, which normalization leaves alone
+QUOTED_RE = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`[^`]*`)")
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+
+# Names following FROM, JOIN, UPDATE, INTO or TABLE
+TABLE_RE = re.compile(r'\b(?:from|join|update|into|table)\s+((?:[\w$]+|"[^"]+"|`[^`]+`)'
+                      r'(?:\.(?:[\w$]+|"[^"]+"|`[^`]+`))?)', re.IGNORECASE)
+
+
+def normalize_sql(sql):
+    """Collapses whitespace and lower cases keywords outside of quotes, and
+    drops a trailing semicolon, so trivially different spellings of the same
+    statement share a cache entry. Names keep their case, as Users and users
+    can be different tables."""
+
+    def keyword(match):
+        word = match.group(0)
+        return word.lower() if word.lower() in KEYWORDS else word
+
+    parts = QUOTED_RE.split(sql.strip().rstrip(';'))
+    for i in range(0, len(parts), 2):
+        parts[i] = WORD_RE.sub(keyword, re.sub(r'\s+', ' ', parts[i]))
+    return ''.join(parts).strip()
+
+
+def is_read_only(sql):
+    """Only plain SELECT, SHOW, DESCRIBE and EXPLAIN statements are cached.
+    Unquoted keywords that could write, such as SELECT ... INTO or EXPLAIN
+    ANALYZE, make a statement count as a write."""
+
+    unquoted = ' '.join(QUOTED_RE.split(sql)[::2])
+    return READ_ONLY_RE.match(unquoted) is not None and WRITE_RE.search(unquoted) is None
+
+
+def is_cacheable(sql):
+    """Whether a statement's result can be reused: a read-only statement that
+    reads at least one table and calls no functions but pure ones, so that
+    SELECT nextval('s'), SELECT now() or SELECT GET_LOCK(...) always reach
+    the server."""
+
+    if not is_read_only(sql) or not referenced_tables(sql):
+        return False
+    unquoted = ' '.join(QUOTED_RE.split(sql)[::2])
+    if VOLATILE_RE.search(unquoted):
+        return False
+    return all(name.lower() in PURE_CALLS for name in CALL_RE.findall(unquoted))
+
+
+def referenced_tables(sql):
+    "Returns the lower cased, unqualified, unquoted names of the tables a statement uses"
+    # Blank out string literals so that words inside them aren't matched
+    sql = STRING_RE.sub("''", sql)
+    return set(match.group(1).split('.')[-1].strip('"`').lower()
+               for match in TABLE_RE.finditer(sql))
+
+
+def estimate_size(value):
+    "Estimates the bytes held by a value, counting the lists, tuples and dicts in it"
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, (list, tuple)):
+        return size
+    return size + sum(estimate_size(item) for item in value)
+
+
+class ResultCache:
+
+    def __init__(self, max_bytes=32 * 1024 * 1024, ttl=60):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (value, size, expiry, scope, tables), oldest use first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        "Returns the value cached for key, or None if there is none or it expired"
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] < time.time():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            # Move to the most recently used end
+            del self._entries[key]
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, scope, tables):
+        """Caches a query result. scope identifies the database it came from
+        and tables are the names it was read from, for invalidate(). An empty
+        set of tables means any write in the scope invalidates it. Results
+        too big to ever fit are not cached."""
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self.size + size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = (value, size, time.time() + self.ttl, scope,
+                                  frozenset(t.lower() for t in tables))
+            self.size += size
+
+    def _remove(self, key):
+        self.size -= self._entries.pop(key)[1]
+
+    def invalidate(self, scope, table_name=None):
+        """Drops every result read from table_name in the given scope, along
+        with results whose tables weren't known. Without a table_name the
+        whole scope is dropped."""
+
+        if table_name is not None:
+            table_name = table_name.split('.')[-1].lower()
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[3] != scope:
+                    continue
+                if table_name is None or not entry[4] or table_name in entry[4]:
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
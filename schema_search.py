@@ -0,0 +1,114 @@
+"""schema_search.py
+
+An in-memory index of the table and column names on one or more database
+servers, answering substring searches without going back to the servers."""
+
+
+from multiprocessing.pool import ThreadPool
+
+
+class SchemaIndex:
+    """Indexes every distinct table and column name by its trigrams. A
+    substring query of three or more characters only has to check the names
+    holding all of its trigrams, so searches stay instant however many
+    databases have been indexed."""
+
+    def __init__(self):
+        # (server, database, table, column) for every column, and
+        # (server, database, table, None) for every table
+        self.entries = []
+
+        # Distinct lower cased names, and the entries each one appears in
+        self.names = []
+        self.name_ids = {}
+        self.name_entries = []
+
+        # trigram -> set of name ids
+        self.trigrams = {}
+
+    def add(self, server, database, table, column=None):
+        """Adds a table, or a column of a table, to the index."""
+
+        entry_id = len(self.entries)
+        self.entries.append((server, database, table, column))
+        self._index_name(column if column is not None else table, entry_id)
+
+    def add_columns(self, server, columns):
+        """Adds the (database, table, column) triples returned by a server's
+        Database.schema_columns(), along with each table they belong to."""
+
+        tables = set()
+        for database, table, column in columns:
+            if (database, table) not in tables:
+                tables.add((database, table))
+                self.add(server, database, table)
+            self.add(server, database, table, column)
+
+    def _index_name(self, name, entry_id):
+        name = name.lower()
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.name_ids[name] = name_id
+            self.names.append(name)
+            self.name_entries.append([])
+            for trigram in self._trigrams(name):
+                self.trigrams.setdefault(trigram, set()).add(name_id)
+        self.name_entries[name_id].append(entry_id)
+
+    def _trigrams(self, text):
+        return set(text[i:i + 3] for i in range(len(text) - 2))
+
+    def search(self, query, limit=None):
+        """Returns the entries whose table (for tables) or column (for
+        columns) name contains query, ignoring case, sorted by location."""
+
+        query = query.lower()
+        if len(query) >= 3:
+            postings = [self.trigrams.get(trigram, set())
+                        for trigram in self._trigrams(query)]
+            postings.sort(key=len)
+            candidates = set(postings[0])
+            for posting in postings[1:]:
+                candidates &= posting
+        else:
+            candidates = range(len(self.names))
+
+        results = []
+        for name_id in candidates:
+            if query in self.names[name_id]:
+                results.extend(self.entries[entry_id]
+                               for entry_id in self.name_entries[name_id])
+        results.sort(key=lambda entry: (entry[0], entry[1], entry[2], entry[3] or ''))
+        return results[:limit] if limit is not None else results
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def build_index(databases, max_workers=8):
+    """Builds a SchemaIndex from a dict of server name to connected Database,
+    fetching every server's catalog in parallel. Returns the index and a dict
+    of server name to the exception raised for servers that failed."""
+
+    def fetch(item):
+        name, database = item
+        try:
+            return name, database.schema_columns(), None
+        except Exception as e:
+            return name, None, e
+
+    pool = ThreadPool(max_workers)
+    try:
+        results = pool.map(fetch, list(databases.items()))
+    finally:
+        pool.close()
+
+    index = SchemaIndex()
+    errors = {}
+    for name, columns, error in results:
+        if error is not None:
+            errors[name] = error
+        else:
+            index.add_columns(name, columns)
+    return index, errors
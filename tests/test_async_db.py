@@ -0,0 +1,84 @@
+import asyncio
+import sys
+
+import pytest
+import sqlalchemy
+
+if sys.version_info < (3,):
+    pytest.skip('async_db needs Python 3', allow_module_level=True)
+
+import db
+import async_db
+
+
+def test_pump_runs_coroutines_a_step_at_a_time():
+    pump = async_db.LoopPump()
+    try:
+        future = pump.submit(asyncio.sleep(0.05, result='done'))
+        pump.pump()
+        assert not future.done()
+        while not future.done():
+            pump.pump(future, budget=0.01)
+        assert future.result() == 'done'
+        assert pump.run(asyncio.sleep(0, result=1)) == 1
+    finally:
+        pump.close()
+
+
+def test_urls_escape_credentials():
+    database = db.PostgresDatabase('me@example', 'p@ss/word:1', 'db.example.com:6432')
+    database._database = 'app'
+    url = async_db.AsyncDatabase(database)._db_string()
+    assert url.drivername == 'postgresql+asyncpg'
+    assert (url.username, url.password, url.host, url.port) == ('me@example', 'p@ss/word:1', 'db.example.com', 6432)
+    assert sqlalchemy.engine.make_url(str(url)).password == 'p@ss/word:1'
+
+
+SCRIPT = """
+CREATE TABLE items (id INTEGER PRIMARY KEY, body TEXT);
+CREATE INDEX items_body ON items (body);
+"""
+
+
+@pytest.fixture
+def adb(make_sqlite):
+    pytest.importorskip('aiosqlite')
+    values = ', '.join("({0}, '{1}')".format(i, 'x' * i) for i in range(1, 101))
+    database = make_sqlite(SCRIPT + "INSERT INTO items VALUES " + values + ";")
+    pump = async_db.LoopPump()
+    adb = async_db.AsyncDatabase(database)
+    yield pump, adb
+    pump.run(adb.close())
+    pump.close()
+
+
+def test_async_database_reads_like_the_database(adb):
+    pump, adb = adb
+    assert async_db.available(adb.db)
+    assert pump.run(adb.count_rows('items')) == 100
+    assert pump.run(adb.list_table_names()) == ['items']
+    assert pump.run(adb.query("SELECT count(*) FROM items WHERE id > 50")) == (['count(*)'], [(50,)])
+
+    page = pump.run(adb.list_rows_page('items', 60, 10))
+    expected = adb.db.list_rows_page('items', 60, 10)
+    assert [(row['id'], str(row['body'])) for row in page] == \
+        [(row['id'], str(row['body'])) for row in expected]
+    assert [row['id'] for row in page] == list(range(61, 71))
+    assert isinstance(page[-1]['body'], db.Truncated)
+
+    indexes, table_stats = pump.run(adb.index_report())
+    assert [index['index_name'] for index in indexes] == ['items_body']
+    assert table_stats == {}
+
+
+def test_read_only_files_stay_read_only(make_sqlite):
+    pytest.importorskip('aiosqlite')
+    make_sqlite(SCRIPT, name='snapshot.db')
+    adb = async_db.AsyncDatabase(make_sqlite(name='snapshot.db', read_only=True))
+    pump = async_db.LoopPump()
+    try:
+        with pytest.raises(Exception):
+            pump.run(adb.query("DELETE FROM items"))
+    finally:
+        pump.run(adb.close())
+        pump.close()
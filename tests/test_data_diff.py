@@ -0,0 +1,44 @@
+from data_diff import TableDiff
+
+
+SCRIPT = "CREATE TABLE t (id INTEGER PRIMARY KEY, name TEXT, n INTEGER);"
+
+
+def rows(count):
+    return ' '.join("INSERT INTO t VALUES ({0}, 'row {0}', {0});".format(i) for i in range(1, count + 1))
+
+
+def test_finds_only_the_rows_that_differ(make_sqlite):
+    left = make_sqlite(SCRIPT + rows(2000), name='left.db')
+    right = make_sqlite(SCRIPT + rows(2000) + """
+        DELETE FROM t WHERE id = 10;
+        UPDATE t SET name = NULL WHERE id = 1500;
+        INSERT INTO t VALUES (2500, 'new', 1);
+    """, name='right.db')
+    diff = TableDiff(left, right, 't', chunk_rows=500, min_rows=50)
+    differences = diff.run()
+    assert [key for key, left_row, right_row in differences] == [10, 1500, 2500]
+    assert [diff.describe(d)[0] for d in differences] == ['-', '~', '+']
+    assert "name: 'row 1500' -> None" in diff.describe(differences[1])
+    # Only the bisected ranges around the differences were fetched
+    assert diff.rows_fetched < 400
+
+
+def test_identical_tables(make_sqlite):
+    left = make_sqlite(SCRIPT + rows(300), name='left.db')
+    right = make_sqlite(SCRIPT + rows(300), name='right.db')
+    diff = TableDiff(left, right, 't', chunk_rows=100)
+    assert diff.run() == []
+    assert diff.chunks_checked == 3
+    assert diff.rows_fetched == 0
+
+
+def test_sparse_keys_are_chunked_by_rows(make_sqlite):
+    values = ' '.join("INSERT INTO t VALUES ({0}, 'row', 1);".format(i * 10 ** 12) for i in range(1, 1001))
+    left = make_sqlite(SCRIPT + values, name='left.db')
+    right = make_sqlite(SCRIPT + values + "UPDATE t SET n = 2 WHERE id = 500000000000000;", name='right.db')
+    diff = TableDiff(left, right, 't', chunk_rows=100, min_rows=10)
+    assert len(diff.initial_ranges()) == 10
+    assert [key for key, left_row, right_row in diff.run()] == [500 * 10 ** 12]
+    assert diff.chunks_checked < 40
+    assert diff.rows_fetched <= 20
@@ -0,0 +1,227 @@
+import sqlalchemy
+import pytest
+
+import db
+import result_cache
+
+
+def split(text, **options):
+    return [statement for statement, size in db.split_statements(text.splitlines(True), **options)]
+
+
+def test_split_statements_keeps_dollar_quoted_bodies_whole():
+    statements = split("CREATE FUNCTION f() RETURNS int AS $_$\nBEGIN\nRETURN 1;\nEND;\n$_$ LANGUAGE plpgsql;\n"
+                       "SELECT 1;\n")
+    assert len(statements) == 2
+    assert statements[0].endswith('plpgsql;\n')
+
+
+def test_split_statements_keeps_strings_and_comments_whole():
+    assert len(split("INSERT INTO t VALUES ('a;\nb');\nSELECT 2;\n")) == 2
+    assert len(split("/* a;\n b; */ SELECT 1; -- c;\nSELECT \"x;\n\";\n")) == 2
+    assert len(split("SELECT E'a\\';\n';\nSELECT $1;\n")) == 2
+    assert len(split("INSERT INTO t VALUES ('it\\'s;\n');\nSELECT 3;\n", backslash_escapes=True)) == 2
+
+
+def test_split_statements_counts_bytes():
+    lines = ["SELECT 1;\n", "SELECT\n", "2;\n", "\n"]
+    assert [size for statement, size in db.split_statements(lines)] == [10, 10]
+
+
+def test_profile_rows():
+    rows = [{'a': i % 3, 'b': None if i % 2 else 'x'} for i in range(6)]
+    profiles = dict((p['column'], p) for p in db.profile_rows(['a', 'b'], rows))
+    assert profiles['a']['distinct'] == 3
+    assert (profiles['a']['min'], profiles['a']['max']) == (0, 2)
+    assert profiles['b']['null_frac'] == 0.5
+    assert profiles['b']['top'] == [('x', 0.5)]
+
+
+def test_profile_rows_estimates_distinct_values_beyond_the_sample():
+    rows = [{'a': i} for i in range(100)]
+    profile = db.profile_rows(['a'], rows, total_rows=10000)[0]
+    assert profile['distinct'] == 10000
+
+
+def test_row_hash_matches_the_server_side_hashes():
+    # md5('1#\N') from Postgres: ('x' || substr(md5(...), 1, 8))::bit(32)::bigint
+    assert db.row_hash(1, None) == 1939267092
+    assert db.row_hash(1.0, None) == db.row_hash(1, None)
+
+
+SCRIPT = """
+CREATE TABLE items (id INTEGER PRIMARY KEY, name VARCHAR(20) NOT NULL, body TEXT, price DECIMAL(10, 2));
+CREATE INDEX items_name ON items (name);
+CREATE INDEX items_name_price ON items (name, price);
+CREATE INDEX items_cheap_name ON items (name) WHERE price < 10;
+CREATE TABLE notes (slug TEXT PRIMARY KEY, body TEXT);
+"""
+
+
+@pytest.fixture
+def items(make_sqlite):
+    database = make_sqlite(SCRIPT)
+    table = database.reflect_table('items')
+    database.bulk_insert(table, [(i, 'item {0}'.format(i), 'x' * (i % 100), i * 1.5) for i in range(1, 1001)])
+    database._base = sqlalchemy.ext.automap.automap_base()
+    database._base.prepare(database._engine, reflect=True)
+    return database
+
+
+def test_connections_are_tuned(items):
+    connection = items._engine.connect()
+    try:
+        assert connection.execute("PRAGMA journal_mode").scalar() == 'wal'
+        assert connection.execute("PRAGMA cache_size").scalar() == -64 * 1024
+    finally:
+        connection.close()
+
+
+def test_read_only_never_writes(make_sqlite, tmp_path):
+    make_sqlite(SCRIPT, name='snapshot.db').bulk_insert(
+        make_sqlite(name='snapshot.db').reflect_table('items'), [(1, 'a', None, None)])
+    snapshot = make_sqlite(name='snapshot.db', read_only=True)
+    assert snapshot.count_rows('items') == 1
+    with pytest.raises(sqlalchemy.exc.OperationalError):
+        snapshot.execute("DELETE FROM items")
+
+
+def test_counts_and_estimates(items):
+    assert items.count_rows('items') == 1000
+    assert items.estimate_rows('items') == 1000
+    assert items.list_databases() == [items._database]
+    assert sorted(items.list_table_names()) == ['items', 'notes']
+
+
+def test_pages_cut_wide_columns_but_not_keys(items):
+    page = items.list_rows_page('items', 60, 10)
+    assert [row['id'] for row in page] == list(range(61, 71))
+    by_id = dict((row['id'], row) for row in page)
+    assert isinstance(by_id[70]['body'], db.Truncated)
+    assert by_id[70]['body'].length == 70
+    # Exactly preview_chars long isn't truncated
+    assert by_id[64]['body'] == 'x' * 64
+    assert items.fetch_row('items', by_id[70])['body'] == 'x' * 70
+
+    long_key = 'k' * 100
+    items.execute("INSERT INTO notes VALUES ('{0}', 'note')".format(long_key))
+    items._base = sqlalchemy.ext.automap.automap_base()
+    items._base.prepare(items._engine, reflect=True)
+    row = items.list_rows_page('notes', 0, 10)[0]
+    assert row['slug'] == long_key
+    assert items.fetch_row('notes', row)['body'] == 'note'
+
+
+def test_sample_and_profile(items):
+    rows = items.sample_rows('items', 50)
+    assert 0 < len(rows) <= 50
+    assert len(set(row['id'] for row in rows)) == len(rows)
+    profiles = dict((p['column'], p) for p in items.column_profile('items', rows))
+    assert profiles['id']['null_frac'] == 0
+
+
+def test_catalog(items):
+    snapshot = items.catalog_snapshot()
+    assert snapshot['items']['primary_key'] == ['id']
+    name = snapshot['items']['columns']['name']
+    assert (name['data_type'], name['char_length'], name['is_nullable']) == ('VARCHAR', 20, 'NO')
+    price = snapshot['items']['columns']['price']
+    assert (price['numeric_precision'], price['numeric_scale']) == (10, 2)
+    indexes = dict((i['index_name'], i) for i in items.index_usage())
+    assert indexes['items_name_price']['columns'] == ['name', 'price']
+    assert indexes['items_name']['scans'] is None
+    assert indexes['items_name']['predicate'] is None
+    assert indexes['items_cheap_name']['predicate'] == 'price < 10'
+    assert ('main', 'items', 'body') in [('main',) + c[1:] for c in items.schema_columns()]
+    assert items.table_stats() == {}
+
+
+def test_apply_changes(items):
+    updated = items.apply_changes('items', ['name', 'price'],
+                                  iter([[('1', 'one', None), ('2', 'two', '5')], [('3', 'three', '7.5')]]))
+    assert updated == 3
+    rows = items.query("SELECT id, name, price FROM items WHERE id <= 4 ORDER BY id")[1]
+    assert rows == [(1, 'one', None), (2, 'two', 5), (3, 'three', 7.5), (4, 'item 4', 6)]
+
+
+def test_apply_changes_rolls_back_and_cleans_up(items):
+    def batches():
+        yield [('1', 'changed', None)]
+        raise RuntimeError('cancelled')
+
+    with pytest.raises(RuntimeError):
+        items.apply_changes('items', ['name', 'price'], batches())
+    assert items.query("SELECT name FROM items WHERE id = 1")[1] == [('item 1',)]
+    # The staging table is gone, so the next run works
+    assert items.apply_changes('items', ['name'], iter([[('1', 'again')]])) == 1
+
+
+def test_apply_changes_refuses_a_key_listed_twice(items):
+    with pytest.raises(sqlalchemy.exc.IntegrityError):
+        items.apply_changes('items', ['name'], iter([[('1', 'a'), ('1', 'b')]]))
+    assert items.query("SELECT name FROM items WHERE id = 1")[1] == [('item 1',)]
+
+
+def test_postgres_staging_tables_get_a_key():
+    class Connection(object):
+        def __init__(self):
+            self.statements = []
+
+        def execute(self, sql):
+            self.statements.append(sql)
+
+    connection = Connection()
+    db.PostgresDatabase('user', 'secret', 'localhost')._prepare_staging(connection, '"staging"', '"id"')
+    assert connection.statements[0] == 'ALTER TABLE "staging" ADD PRIMARY KEY ("id")'
+
+
+def test_change_rows_chunked(items):
+    chunks = list(items.change_rows_chunked('items', 'id > 900', chunk_rows=30))
+    assert sum(chunks) == 100
+    assert len(chunks) == 4
+    assert items.count_rows('items') == 900
+    changed = list(items.change_rows_chunked('items', 'id <= 10', "name = 'low'", chunk_rows=4))
+    assert sum(changed) == 10
+
+
+def test_query_cache(items):
+    cache = result_cache.ResultCache()
+    items.use_result_cache(cache)
+    sql = "SELECT count(*) FROM items"
+    assert items.query(sql)[1] == [(1000,)]
+    items._engine.execute("DELETE FROM items WHERE id = 1")
+    # Still cached, as the write went around the Database
+    assert items.query(sql)[1] == [(1000,)]
+    items.query("DELETE FROM items WHERE id = 2")
+    assert items.query(sql)[1] == [(998,)]
+    # Anything that isn't a pure read of a table always runs
+    first = items.query("SELECT random() FROM items LIMIT 1")[1]
+    assert items.query("SELECT random() FROM items LIMIT 1")[1] != first
+
+
+def test_connect_url(tmp_path):
+    path = str(tmp_path / 'url.db')
+    database = db.connect_url('sqlite:///' + path)
+    assert database._database == path
+    database._engine.dispose()
+
+
+def test_postgres_previews_measure_the_text_they_cut():
+    from sqlalchemy.dialects import postgresql
+    metadata = sqlalchemy.MetaData()
+    table = sqlalchemy.Table('docs', metadata,
+                             sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+                             sqlalchemy.Column('doc', postgresql.JSONB),
+                             sqlalchemy.Column('data', sqlalchemy.LargeBinary))
+    database = db.PostgresDatabase('user', 'secret', 'localhost')
+    selected, convert = database._preview_select(table)
+    sql = str(sqlalchemy.select(selected).compile(dialect=postgresql.dialect()))
+    assert 'octet_length(CAST(docs.doc AS TEXT))' in sql
+    assert 'octet_length(CAST(docs.data AS TEXT))' in sql
+
+    # bytea comes back as hex, so 100 bytes are 202 characters of text
+    row = convert({'id': 1, 'doc': '{"a": 1}', '_length_doc': 8,
+                   'data': '\\x' + 'ab' * 31, '_length_data': 202})
+    assert row['doc'] == '{"a": 1}'
+    assert isinstance(row['data'], db.Truncated)
+    assert row['data'].length == 202
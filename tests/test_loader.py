@@ -0,0 +1,80 @@
+import json
+
+import loader
+
+
+SCRIPT = "CREATE TABLE people (id INTEGER PRIMARY KEY, name TEXT NOT NULL, age INTEGER, tags TEXT);"
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+def test_csv_rows_the_server_refuses_go_to_the_rejects_file(make_sqlite, tmp_path):
+    database = make_sqlite(SCRIPT)
+    filename = write(tmp_path, 'people.csv',
+                     'id,name,age,unknown\n1,ann,30,x\n2,bob,,x\n1,dup,5,x\nbroken\n3,cat,7,x\n')
+    table_loader = loader.TableLoader(database, 'people', filename, batch_rows=2)
+    assert table_loader.run() == 3
+    assert table_loader.rows_rejected == 2
+    rows = database.query("SELECT id, name, age FROM people ORDER BY id")[1]
+    # An empty field is NULL outside of text columns
+    assert rows == [(1, 'ann', 30), (2, 'bob', None), (3, 'cat', 7)]
+
+    with open(filename + '.rejects') as f:
+        rejects = f.read().splitlines()
+    assert rejects[0] == '# could not be parsed: broken'
+    assert rejects[1] == 'id,name,age,unknown,_error'
+    assert rejects[2].startswith('1,dup,5,x,')
+
+
+def test_ndjson_keeps_nested_values_as_json(make_sqlite, tmp_path):
+    database = make_sqlite(SCRIPT)
+    filename = write(tmp_path, 'people.ndjson',
+                     '{"id": 1, "name": "ann", "tags": ["a", "b"]}\n\n[1]\n{"id": 2, "name": null}\n')
+    table_loader = loader.TableLoader(database, 'people', filename)
+    assert table_loader.run() == 1
+    assert table_loader.rows_rejected == 2
+    tags = database.query("SELECT tags FROM people WHERE id = 1")[1][0][0]
+    assert json.loads(tags) == ['a', 'b']
+    with open(filename + '.rejects') as f:
+        assert json.loads(f.read().splitlines()[1])['id'] == 2
+
+
+def test_ndjson_records_each_name_their_columns(make_sqlite, tmp_path):
+    database = make_sqlite(SCRIPT)
+    filename = write(tmp_path, 'people.ndjson',
+                     '{"id": 1, "name": "ann"}\n{"id": 2, "name": "bob", "age": 40}\n'
+                     '{"name": "cat", "id": 3}\n{"id": 4, "name": "dan", "email": "d@example.com"}\n')
+    table_loader = loader.TableLoader(database, 'people', filename, batch_rows=10)
+    assert table_loader.run() == 3
+    assert database.query("SELECT id, name, age FROM people ORDER BY id")[1] == \
+        [(1, 'ann', None), (2, 'bob', 40), (3, 'cat', None)]
+    # A key the table has no column for is never dropped quietly
+    with open(filename + '.rejects') as f:
+        rejected = json.loads(f.read())
+    assert rejected['email'] == 'd@example.com'
+    assert rejected['_error'] == "'people' has no column email"
+
+
+def test_change_applier(make_sqlite, tmp_path):
+    database = make_sqlite(SCRIPT + "INSERT INTO people VALUES (1, 'ann', 30, NULL), (2, 'bob', 40, NULL);")
+    filename = write(tmp_path, 'changes.csv', 'age,id\n31,1\n,2\n,3\n')
+    applier = loader.ChangeApplier(database, 'people', filename, batch_rows=2)
+    assert applier.run() == 2
+    assert applier.rows_staged == 3
+    assert database.query("SELECT id, age FROM people ORDER BY id")[1] == [(1, 31), (2, None)]
+
+
+def test_change_applier_changes_nothing_on_a_bad_line(make_sqlite, tmp_path):
+    database = make_sqlite(SCRIPT + "INSERT INTO people VALUES (1, 'ann', 30, NULL);")
+    filename = write(tmp_path, 'changes.csv', 'id,age\n1,31\n2\n')
+    try:
+        loader.ChangeApplier(database, 'people', filename, batch_rows=1).run()
+    except ValueError as e:
+        assert 'Line 3' in str(e)
+    else:
+        raise AssertionError('the short line was accepted')
+    assert database.query("SELECT age FROM people")[1] == [(30,)]
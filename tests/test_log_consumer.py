@@ -0,0 +1,46 @@
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'refs'))
+
+from simple_log_consumer import HeavyHitters, SlidingWindowCounter
+
+
+def test_heavy_hitters_track_every_frequent_key():
+    rng = random.Random(1)
+    stream = ['hot'] * 300 + ['warm'] * 150 + ['cold {0}'.format(i) for i in range(550)]
+    rng.shuffle(stream)
+    hitters = HeavyHitters(10)
+    for key in stream:
+        hitters.add(key)
+    counts = dict(hitters.top(10))
+    assert [key for key, count in hitters.top(2)] == ['hot', 'warm']
+    for key, true_count in Counter(stream).items():
+        if key in counts:
+            assert true_count <= counts[key] <= true_count + hitters.error_bound()
+
+
+def test_heavy_hitters_round_trip():
+    hitters = HeavyHitters(3)
+    for key, weight in [('a', 5), ('b', 2), ('c', 1), ('d', 4)]:
+        hitters.add(key, weight)
+    restored = HeavyHitters.from_dict(hitters.to_dict())
+    assert restored.top(3) == hitters.top(3)
+    restored.add('a')
+    assert restored.top(1) == [('a', 6)]
+
+
+def test_sliding_window_expires_old_seconds():
+    window = SlidingWindowCounter(120)
+    window.add(1000, 5)
+    window.add(1060, 3)
+    assert window.count(1060) == 8
+    assert window.count(1119) == 8
+    assert window.count(1120) == 3
+    # Too old for the window
+    window.add(1000)
+    assert window.count(1120) == 3
+    assert window.count(2000) == 0
+    assert SlidingWindowCounter.from_dict(window.to_dict()).count(2000) == 0
@@ -0,0 +1,69 @@
+import monitor
+
+
+def counters(inserts, seq_scans=0, idx_scans=0, blks_hit=None, blks_read=None):
+    return {'inserts': inserts, 'updates': 0, 'deletes': 0, 'seq_scans': seq_scans,
+            'idx_scans': idx_scans, 'blks_hit': blks_hit, 'blks_read': blks_read}
+
+
+def test_sample_turns_counters_into_rates():
+    table_monitor = monitor.TableThroughputMonitor(None)
+    table_monitor.sample({'t': counters(10, blks_hit=0, blks_read=0)})
+    table_monitor._last_time -= 2
+    table_monitor.sample({'t': counters(30, blks_hit=9, blks_read=1)})
+    rates = table_monitor.latest['t']
+    assert 9 < rates['inserts'] <= 10
+    assert rates['hit_ratio'] == 0.9
+
+
+def test_dropped_tables_are_forgotten():
+    table_monitor = monitor.TableThroughputMonitor(None)
+    table_monitor.sample({'t': counters(1), 'u': counters(1)})
+    table_monitor._last_time -= 1
+    table_monitor.sample({'t': counters(2), 'u': counters(2)})
+    table_monitor._last_time -= 1
+    table_monitor.sample({'t': counters(3)})
+    assert 'u' not in table_monitor.history
+
+
+def index(name, columns, scans=0, is_unique=False, is_primary=False, predicate=None):
+    return {'table_name': 't', 'index_name': name, 'columns': columns, 'scans': scans,
+            'is_unique': is_unique, 'is_primary': is_primary, 'predicate': predicate,
+            'size_bytes': None}
+
+
+def test_flag_indexes():
+    flags = monitor.flag_indexes([
+        index('t_pkey', ['id'], is_primary=True),
+        index('t_a', ['a'], scans=5),
+        index('t_a_b', ['a', 'b'], scans=5),
+        index('t_c', ['c']),
+        index('t_d', ['d'], scans=None),
+    ])
+    assert flags[('t', 't_pkey')] == []
+    assert flags[('t', 't_a')] == ['duplicate of t_a_b']
+    assert flags[('t', 't_a_b')] == []
+    assert flags[('t', 't_c')] == ['unused']
+    # Usage that isn't tracked isn't reported as unused
+    assert flags[('t', 't_d')] == []
+
+
+def test_expression_and_partial_indexes_are_not_duplicates():
+    flags = monitor.flag_indexes([
+        index('t_pkey', ['id'], is_primary=True),
+        index('t_email', ['email'], scans=5),
+        index('t_lower_email', ['lower(email)'], scans=5),
+        index('t_unreadable', [], scans=5),
+        index('t_email_active', ['email'], scans=5, predicate='active'),
+        index('t_email_active_2', ['email'], scans=5, predicate='active'),
+    ])
+    assert flags[('t', 't_email')] == []
+    assert flags[('t', 't_lower_email')] == []
+    assert flags[('t', 't_unreadable')] == []
+    assert flags[('t', 't_email_active')] == []
+    assert flags[('t', 't_email_active_2')] == ['duplicate of t_email_active']
+
+
+def test_seq_scan_ratio():
+    assert monitor.seq_scan_ratio(counters(0)) is None
+    assert monitor.seq_scan_ratio(counters(0, seq_scans=1, idx_scans=3)) == 0.25
@@ -0,0 +1,105 @@
+import threading
+import time
+
+from prefetch import PagePrefetcher
+
+
+class FakePages:
+
+    def __init__(self, delay=0):
+        self.delay = delay
+        self.fetched = []
+        self.lock = threading.Lock()
+
+    def __call__(self, page):
+        time.sleep(self.delay)
+        with self.lock:
+            self.fetched.append(page)
+        return ['row {0}.{1}'.format(page, i) for i in range(3)]
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_get_returns_the_page_and_prefetches_the_next():
+    pages = FakePages()
+    prefetcher = PagePrefetcher(pages, num_pages=10)
+    try:
+        assert prefetcher.get(0) == ['row 0.0', 'row 0.1', 'row 0.2']
+        assert wait_for(lambda: 1 in prefetcher._pages)
+        prefetcher.get(1)
+        assert pages.fetched.count(1) == 1
+    finally:
+        prefetcher.close()
+
+
+def test_never_fetches_past_the_ends():
+    pages = FakePages()
+    prefetcher = PagePrefetcher(pages, num_pages=2)
+    try:
+        prefetcher.get(1)
+        time.sleep(0.05)
+        assert all(0 <= page < 2 for page in pages.fetched)
+    finally:
+        prefetcher.close()
+
+
+def test_keeps_at_most_max_pages():
+    prefetcher = PagePrefetcher(FakePages(), num_pages=100, max_pages=4)
+    try:
+        for page in range(20):
+            prefetcher.get(page)
+        assert wait_for(lambda: not prefetcher._in_flight)
+        assert len(prefetcher._pages) <= 4
+    finally:
+        prefetcher.close()
+
+
+def test_invalidate_drops_pages_fetched_before_it():
+    pages = FakePages(delay=0.05)
+    prefetcher = PagePrefetcher(pages, num_pages=10)
+    try:
+        prefetcher.get(0)
+        prefetcher.invalidate(num_pages=5)
+        time.sleep(0.1)
+        assert prefetcher._pages == {}
+        assert prefetcher.num_pages == 5
+    finally:
+        prefetcher.close()
+
+
+def test_velocity_follows_the_direction_of_travel():
+    prefetcher = PagePrefetcher(FakePages(), num_pages=100)
+    try:
+        for page in (10, 9, 8):
+            prefetcher._note_position(page)
+            time.sleep(0.01)
+        assert prefetcher.velocity() < 0
+    finally:
+        prefetcher.close()
+
+
+def test_failed_fetches_reach_the_caller_and_are_retried():
+    calls = []
+
+    def flaky(page):
+        calls.append(page)
+        if len(calls) == 1:
+            raise IOError('connection lost')
+        return [page]
+
+    prefetcher = PagePrefetcher(flaky, num_pages=1)
+    try:
+        try:
+            prefetcher.get(0)
+        except IOError:
+            pass
+        else:
+            raise AssertionError('the failure was swallowed')
+        assert prefetcher.get(0) == [0]
+    finally:
+        prefetcher.close()
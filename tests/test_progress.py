@@ -0,0 +1,38 @@
+import pytest
+
+import progress
+
+
+def test_tracker_counts_and_reports_fraction():
+    tracker = progress.ProgressTracker('job', total_bytes=100)
+    tracker.add(rows=5, nbytes=25)
+    info = tracker.snapshot()
+    assert info['rows'] == 5
+    assert info['fraction'] == 0.25
+    lines = tracker.status_lines(60)
+    assert len(lines) == 2
+    assert lines[0].startswith(' 25.0%')
+
+
+def test_cancel_stops_the_job_when_it_reports_in():
+    tracker = progress.ProgressTracker('job')
+
+    def job(tracker):
+        while True:
+            tracker.add(rows=1)
+
+    background = progress.BackgroundJob(job, tracker)
+    tracker.cancel()
+    background.start()
+    background._thread.join(2)
+    assert background.done()
+    assert isinstance(background.error, progress.Cancelled)
+
+
+def test_bytes_only_jobs_have_no_unit():
+    tracker = progress.ProgressTracker('dump', unit=None)
+    tracker.set(nbytes=2048)
+    assert tracker.status_lines(80)[0].startswith('2.0KB')
+    with pytest.raises(progress.Cancelled):
+        tracker.cancel()
+        tracker.check()
@@ -0,0 +1,73 @@
+import time
+
+from result_cache import ResultCache, is_cacheable, is_read_only, normalize_sql, referenced_tables
+
+
+def test_normalize_sql_leaves_quotes_alone():
+    assert normalize_sql("SELECT  *\n FROM t WHERE name = 'A  B';") == "select * from t where name = 'A  B'"
+
+
+def test_normalize_sql_keeps_the_case_of_names():
+    assert normalize_sql("SELECT * FROM Users") != normalize_sql("SELECT * FROM users")
+    assert normalize_sql('select * from "Users"') != normalize_sql('select * from "users"')
+    assert normalize_sql("Select Count(*) From Users") == normalize_sql("SELECT count(*) FROM Users")
+
+
+def test_is_read_only():
+    assert is_read_only("SELECT * FROM t")
+    assert is_read_only("  (select 1)")
+    assert not is_read_only("SELECT * INTO copy FROM t")
+    assert not is_read_only("EXPLAIN ANALYZE SELECT 1")
+    assert not is_read_only("UPDATE t SET a = 1")
+    assert is_read_only("SELECT 'insert' FROM t")
+
+
+def test_referenced_tables():
+    assert referenced_tables('SELECT * FROM public."Orders" o JOIN `items` i ON 1 = 1') == {'orders', 'items'}
+    assert referenced_tables("SELECT 'from x' FROM t") == {'t'}
+
+
+def test_is_cacheable_needs_tables_and_pure_functions():
+    assert is_cacheable("SELECT count(*) FROM orders WHERE id IN (SELECT id FROM items)")
+    assert not is_cacheable("SELECT 1")
+    assert not is_cacheable("SELECT nextval('s')")
+    assert not is_cacheable("SELECT GET_LOCK('x', 1)")
+    assert not is_cacheable("SELECT * FROM t WHERE created > now()")
+    assert not is_cacheable("SELECT current_timestamp FROM t")
+    assert not is_cacheable("DELETE FROM t")
+    assert is_cacheable("SELECT 'now()' FROM t")
+
+
+def test_lru_eviction_by_size():
+    cache = ResultCache(max_bytes=10 ** 6, ttl=60)
+    big = ['x' * 1000] * 100
+    cache.max_bytes = 3 * len(str(big))
+    for key in range(5):
+        cache.put(key, list(big), 'scope', ['t'])
+    assert cache.size <= cache.max_bytes
+    assert cache.get(0) is None
+    assert cache.get(4) is not None
+
+
+def test_expiry():
+    cache = ResultCache(ttl=0.01)
+    cache.put('k', [1], 'scope', ['t'])
+    time.sleep(0.02)
+    assert cache.get('k') is None
+    assert cache.misses == 1
+
+
+def test_invalidate_by_table_and_scope():
+    cache = ResultCache()
+    cache.put('a', 1, 's1', ['orders'])
+    cache.put('b', 2, 's1', ['items'])
+    cache.put('c', 3, 's1', [])
+    cache.put('d', 4, 's2', ['orders'])
+    cache.invalidate('s1', 'public.Orders')
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    # Results whose tables weren't known go with any write
+    assert cache.get('c') is None
+    assert cache.get('d') == 4
+    cache.invalidate('s2')
+    assert cache.get('d') is None
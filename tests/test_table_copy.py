@@ -0,0 +1,15 @@
+from table_copy import TableCopy
+
+
+def test_copies_between_files(make_sqlite):
+    values = ', '.join("({0}, 'row {0}', {0}.5)".format(i) for i in range(1, 1001))
+    source = make_sqlite("CREATE TABLE t (id INTEGER PRIMARY KEY, name VARCHAR(20), x REAL);"
+                         "INSERT INTO t VALUES " + values + ";", name='source.db')
+    target = make_sqlite(name='target.db')
+    reports = []
+    copy = TableCopy(source, target, 't', target_name='t_copy', batch_rows=64, queue_batches=2)
+    assert copy.run(progress=reports.append, interval=0.01) == 1000
+    assert reports
+    assert target.query("SELECT count(*) FROM t_copy")[1] == [(1000,)]
+    assert target.query("SELECT * FROM t_copy WHERE id = 7")[1] == [(7, 'row 7', 7.5)]
+    assert target.reflect_table('t_copy').primary_key.columns.keys() == ['id']